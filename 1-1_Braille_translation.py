@@ -64,49 +64,50 @@ Output:
 """
 
 
+import argparse
+import contextlib
+import io
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+import timeit
 import unittest
+import unittest.mock
 from pprint import pprint
 
+from google_foobar.braille import *  # noqa: F401,F403
+from google_foobar.memo import ResultCache, cached
 
-def solution(s):
-    # Your code here
-    table = {
-        " ": "000000",
-        "a": "100000",
-        "b": "110000",
-        "c": "100100",
-        "d": "100110",
-        "e": "100010",
-        "f": "110100",
-        "g": "110110",
-        "h": "110010",
-        "i": "010100",
-        "j": "010110",
-        "k": "101000",
-        "l": "111000",
-        "m": "101100",
-        "n": "101110",
-        "o": "101010",
-        "p": "111100",
-        "q": "111110",
-        "r": "111010",
-        "s": "011100",
-        "t": "011110",
-        "u": "101001",
-        "v": "111001",
-        "w": "010111",
-        "x": "101101",
-        "y": "101111",
-        "z": "101011",
-        "C": "000001",
-    }
-    buffer = ""
-    for ch in s:
-        if ch.isupper():
-            buffer += table["C"]
-        if ch.lower() in table:
-            buffer += table[ch.lower()]
-    return buffer
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encode sign texts to Braille cells.")
+    parser.add_argument("input", help="newline-delimited file, or a directory of one sign per file")
+    parser.add_argument("-o", "--output", help="output file, one encoded sign per line (default stdout)")
+    parser.add_argument("-w", "--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("-b", "--batch-size", type=int, default=1000, help="signs per task")
+    parser.add_argument("-g", "--grade", type=int, choices=(1, 2), default=1)
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    start = time.perf_counter()
+    count = 0
+    try:
+        for cells in run_jobs(iter_signs(args.input), args.workers, args.batch_size, args.grade):
+            out.write(cells)
+            out.write("\n")
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(
+        "encoded {} signs in {:.3f}s ({:.0f} signs/s)".format(count, elapsed, count / (elapsed or 1)),
+        file=sys.stderr,
+    )
+    return 0
 
 
 class BrailleTestCase(unittest.TestCase):
@@ -128,6 +129,239 @@ class BrailleTestCase(unittest.TestCase):
         result = solution(input_str)
         self.assertEqual(expected, result)
 
+    def test_ignores_unknown_characters(self):
+        self.assertEqual(solution("a1b!"), solution("ab"))
+
+    def test_encode_stream_matches_solution(self):
+        text = "The quick brown fox jumps over the lazy dog" * 50
+        chunks = [text[i : i + 7] for i in range(0, len(text), 7)]
+        self.assertEqual("".join(encode_stream(chunks)), solution(text))
+
+    def test_encode_to_file_object(self):
+        text = "Braille Signs " * 100
+        out = io.StringIO()
+        written = encode_to(io.StringIO(text), out, chunk_size=5)
+        self.assertEqual(out.getvalue(), solution(text))
+        self.assertEqual(written, len(out.getvalue()))
+
+    def test_encode_packed(self):
+        expected = bytes([0b000001, 0b100100, 0b101010, 0b100110, 0b100010])
+        self.assertEqual(encode_packed("Code"), expected)
+
+    def test_packed_round_trip(self):
+        text = "The quick brown fox jumps over the lazy dog"
+        packed = encode_packed(text)
+        self.assertEqual(len(packed) * 6, len(solution(text)))
+        self.assertEqual(decode_packed(packed), solution(text))
+        self.assertEqual(decode_packed(memoryview(bytearray(packed))), solution(text))
+
+    def test_bit_packed_round_trip(self):
+        for text in ("", "a", "Braille", "The quick brown fox jumps over the lazy dog"):
+            cells = solution(text)
+            data = pack_bits(cells)
+            self.assertEqual(len(data), (len(cells) + 7) // 8)
+            self.assertEqual(unpack_bits(data, len(cells) // 6), cells)
+
+    def test_encode_to_packed(self):
+        text = "Braille Signs " * 100
+        out = io.BytesIO()
+        encode_to(io.StringIO(text), out, chunk_size=5, packed=True)
+        self.assertEqual(decode_packed(out.getvalue()), solution(text))
+
+    def test_reference_solution(self):
+        text = "The Quick brown fox jumps over the lazy dog"
+        self.assertEqual(reference_solution(text), solution(text))
+
+    def test_encode_batch(self):
+        texts = ["code", "Braille", "", "The quick brown fox jumps over the lazy dog"]
+        self.assertEqual(encode_batch(texts), [solution(text) for text in texts])
+        self.assertEqual(encode_batch(iter(texts)), [solution(text) for text in texts])
+        self.assertEqual(encode_batch([]), [])
+        # non-ASCII text, and a sign holding the separator itself
+        for odd in (["\u212aelvin", "Éa", "ok"], ["a\x00b", "c"], [""]):
+            self.assertEqual(encode_batch(odd), [solution(text) for text in odd])
+        # without NumPy the joined signs go through one str.translate()
+        with unittest.mock.patch.dict(sys.modules, {"numpy": None}):
+            self.assertEqual(encode_batch(texts), [solution(text) for text in texts])
+
+    def test_encode_batch_matrix(self):
+        texts = ["code", "Braille", ""]
+        matrix = encode_batch(texts, matrix=True)
+        self.assertEqual(matrix.shape, (3, 48))
+        self.assertEqual(matrix.tolist()[0][:24], [int(dot) for dot in solution("code")])
+        self.assertEqual(matrix.tolist()[0][24:], [0] * 24)
+        self.assertEqual(matrix.tolist()[2], [0] * 48)
+
+    def test_decode_text(self):
+        text = "The quick brown fox jumps over the lazy dog"
+        self.assertEqual(decode_text(solution(text)), text)
+        self.assertEqual(decode_text(encode_packed(text)), text)
+        self.assertEqual(decode_text(bytearray(encode_packed("Braille"))), "Braille")
+        self.assertEqual(decode_text(""), "")
+
+    def test_decode_text_rejects_bad_input(self):
+        for cells in ("10010", "1001001", "12345a", "000001", "000001000000", "111111"):
+            with self.assertRaises(ValueError):
+                decode_text(cells)
+
+    def test_decode_text_stream(self):
+        text = "A Quick Brown Fox " * 40
+        cells = solution(text)
+        for size in (1, 5, 6, 7, 100):
+            chunks = [cells[i : i + size] for i in range(0, len(cells), size)]
+            self.assertEqual("".join(decode_text_stream(chunks)), text)
+        packed = io.BytesIO(encode_packed(text))
+        self.assertEqual("".join(decode_text_stream(packed, chunk_size=1)), text)
+
+    def test_decode_text_stream_truncated(self):
+        with self.assertRaises(ValueError):
+            list(decode_text_stream(["100000", "1001"]))
+        with self.assertRaises(ValueError):
+            list(decode_text_stream([encode_packed("aB")[:-1]]))
+
+    def test_grade2_wordsigns(self):
+        self.assertEqual(encode_grade2("the"), "011101")
+        self.assertEqual(encode_grade2("The"), "000001011101")
+        self.assertEqual(encode_grade2("knowledge"), TABLE["k"])
+        self.assertEqual(encode_grade2("you and it"), "101111000000111101000000101101")
+
+    def test_grade2_standalone_letters(self):
+        self.assertNotEqual(encode_grade2("b"), encode_grade2("but"))
+        self.assertEqual(encode_grade2("b"), GRADE1_INDICATOR + TABLE["b"])
+        self.assertEqual(encode_grade2("B"), GRADE1_INDICATOR + solution("B"))
+        self.assertNotEqual(encode_grade2("B"), encode_grade2("But"))
+        # a, i and o are not wordsigns and need no indicator
+        self.assertEqual(encode_grade2("a i o"), solution("a i o"))
+        self.assertEqual(encode_grade2("x it"), GRADE1_INDICATOR + TABLE["x"] + TABLE[" "] + TABLE["x"])
+
+    def test_grade2_groupsigns(self):
+        self.assertEqual(encode_grade2("father"), TABLE["f"] + TABLE["a"] + "011101" + TABLE["r"])
+        self.assertEqual(encode_grade2("Shirt"), "000001100101" + solution("irt"))
+        self.assertEqual(encode_grade2("sing"), TABLE["s"] + "001101")
+        self.assertEqual(encode_grade2("THE"), solution("THE"))
+
+    def test_grade2_is_shorter(self):
+        text = "The quick brown fox jumps over the lazy dog"
+        self.assertLess(len(encode_grade2(text)), len(solution(text)))
+        self.assertEqual(encode_grade2("zebra quiz"), solution("zebra quiz"))
+
+    def test_grade2_stream(self):
+        text = "the father and the mother will go shopping with you " * 30
+        for size in (1, 4, 13, 1000):
+            chunks = [text[i : i + size] for i in range(0, len(text), size)]
+            self.assertEqual("".join(encode_stream(chunks, grade=2)), encode_grade2(text))
+        out = io.BytesIO()
+        encode_to(io.StringIO(text.strip()), out, chunk_size=7, packed=True, grade=2)
+        self.assertEqual(decode_packed(out.getvalue()), encode_grade2(text.strip()))
+
+    def test_grade2_any_whitespace_ends_a_word(self):
+        self.assertEqual(encode_grade2("go\nthe"), TABLE["g"] + WORDSIGNS["the"])
+        self.assertEqual(encode_grade2("go\tthe  so"), encode_grade2("go") + encode_grade2("the") + "0" * 12 + TABLE["s"])
+        text = "go the\nfather and\nyou"
+        lines = list(iter_lines(text, grade=2))
+        self.assertEqual("".join(lines), cells_to_packed(encode_grade2(text)).decode("latin-1"))
+        for size in (1, 3, 8):
+            chunks = [text[i : i + size] for i in range(0, len(text), size)]
+            self.assertEqual("".join(encode_stream(chunks, grade=2)), encode_grade2(text))
+
+    def test_grade2_stream_long_words(self):
+        # a run without whitespace is contracted, and streamed, in bounded pieces
+        with unittest.mock.patch("google_foobar.braille.MAX_WORD_LENGTH", 8):
+            text = "the " + "shoring" * 5 + " go\n" + "x" * 16 + "\nb"
+            expected = encode_grade2(text)
+            self.assertEqual(encode_grade2("shoringshoring"), encode_grade2("shorings") + encode_grade2("horing"))
+            for size in (1, 3, 5, 9, 100):
+                chunks = [text[i : i + size] for i in range(0, len(text), size)]
+                self.assertEqual("".join(encode_stream(chunks, grade=2)), expected, msg=size)
+
+    def test_run_jobs_keeps_order(self):
+        signs = ["Sign number {}".format(i) for i in range(250)]
+        result = list(run_jobs(iter(signs), workers=2, batch_size=7))
+        self.assertEqual(result, [solution(sign) for sign in signs])
+        result = list(run_jobs(iter(signs), workers=2, batch_size=50, grade=2))
+        self.assertEqual(result, [encode_grade2(sign) for sign in signs])
+        # a list works as well as an iterator
+        self.assertEqual(list(run_jobs(["a", "b", "c"], workers=1, batch_size=2)), encode_batch("abc"))
+
+    def test_main_encodes_file_and_directory(self):
+        signs = ["Exit", "The Bridge", ""]
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "signs.txt")
+            with open(source, "w") as f:
+                f.write("\n".join(signs) + "\n")
+            folder = os.path.join(tmp, "signs")
+            os.mkdir(folder)
+            for i, sign in enumerate(signs):
+                with open(os.path.join(folder, "{:03}.txt".format(i)), "w") as f:
+                    f.write(sign + "\n")
+            expected = "".join(solution(sign) + "\n" for sign in signs)
+            for path in (source, folder):
+                output = os.path.join(tmp, "out.txt")
+                stderr = io.StringIO()
+                with contextlib.redirect_stderr(stderr):
+                    main([path, "-o", output, "-w", "2", "-b", "2"])
+                self.assertIn("encoded 3 signs", stderr.getvalue())
+                with open(output) as f:
+                    self.assertEqual(f.read(), expected)
+
+    def test_iter_lines_wraps_words(self):
+        text = "The quick brown Fox jumps"
+        lines = list(iter_lines(text, cells_per_line=10))
+        self.assertEqual([decode_text(line.encode("latin-1")) for line in lines], ["The quick", "brown Fox", "jumps"])
+        self.assertTrue(all(len(line) <= 10 for line in lines))
+        # an over-long word is split, but never right after a capital mark
+        lines = list(iter_lines("abcD efgh\n\nij", cells_per_line=4))
+        self.assertEqual(lines, [encode_packed(part).decode("latin-1") for part in ("abc", "D", "efgh", "", "ij")])
+        with self.assertRaises(ValueError):
+            list(iter_lines("a", cells_per_line=1))
+
+    def test_iter_lines_chunk_boundaries(self):
+        random.seed(3)
+        text = "".join(random.choice(string.ascii_letters + "  \n") for _ in range(2000))
+        expected = list(iter_lines(text, 17))
+        for chunk_size in (1, 5, 64):
+            self.assertEqual(list(iter_lines(io.StringIO(text), 17, chunk_size)), expected)
+        contracted = list(iter_lines(io.StringIO("the cat and the hat"), 12, 3, grade=2))
+        self.assertEqual(contracted, list(iter_lines("the cat and the hat", 12, grade=2)))
+        self.assertLess(len("".join(contracted)), len("".join(iter_lines("the cat and the hat", 12))))
+
+    def test_iter_pages_dot_layout(self):
+        text = "\n".join("Line {} of the Manual".format(word) for word in string.ascii_lowercase)
+        pages = [bytes(page) for page in iter_pages(text, cells_per_line=12, lines_per_page=5)]
+        lines = list(iter_lines(text, 12))
+        self.assertEqual(len(pages), -(-len(lines) // 5))
+        for number, line in enumerate(lines):
+            page = pages[number // 5]
+            top = 3 * (number % 5)
+            for column, cell in enumerate(line):
+                dots = "".join(str(page[(top + row) * 24 + 2 * column + side]) for side in (0, 1) for row in range(3))
+                self.assertEqual(dots, format(ord(cell), "06b"))
+            # everything right of the last cell is blank
+            for row in range(3):
+                start = (top + row) * 24
+                self.assertFalse(any(page[start + 2 * len(line) : start + 24]))
+        self.assertNotEqual(len(lines) % 5, 0)
+        self.assertFalse(any(pages[-1][3 * (len(lines) % 5) * 24 :]))
+        # a reused page is cleared, from a shared zero buffer when given one
+        page = memoryview(bytearray(b"\x01" * 48)).cast("B", [6, 8])
+        for blank in (None, bytes(48)):
+            rendered = bytes(render_page([encode_packed("ab").decode("latin-1")], page, blank))
+            self.assertEqual(rendered[:8], bytes([1, 0, 1, 0, 0, 0, 0, 0]))
+            self.assertFalse(any(rendered[24:]))
+
+    def test_cached_solution(self):
+        now = [0.0]
+        cache = ResultCache(max_entries=2, ttl=10, clock=lambda: now[0])
+        encode = cached(solution, cache)
+        for text in ("code", "Braille", "code", "The quick brown fox"):
+            self.assertEqual(encode(text), solution(text))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        now[0] = 11
+        self.assertEqual(encode("The quick brown fox"), solution("The quick brown fox"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+        self.assertEqual(cache.stats()["misses"], 4)
+
 
 def to_mapping():
     text = "the quick brown fox jumps over the lazy dog"
@@ -136,6 +370,24 @@ def to_mapping():
     pprint(dict(zip(text, braille_chunk)))
 
 
+def benchmark(count=10000, length=50, repeat=5):
+    random.seed(0)
+    alphabet = string.ascii_letters + " "
+    texts = ["".join(random.choice(alphabet) for _ in range(length)) for _ in range(count)]
+    candidates = [
+        ("reference loop", lambda: [reference_solution(text) for text in texts]),
+        ("solution loop", lambda: [solution(text) for text in texts]),
+        ("encode_batch", lambda: encode_batch(texts)),
+        ("encode_batch matrix", lambda: encode_batch(texts, matrix=True)),
+    ]
+    for name, func in candidates:
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        print("{:<20} {:>10.0f} signs/s".format(name, count / best))
+
+
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["encode"]:
+        sys.exit(main(sys.argv[2:]))
     unittest.main(verbosity=2)
     # to_mapping()
+    # benchmark()
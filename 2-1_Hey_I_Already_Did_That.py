@@ -52,45 +52,16 @@ Output:
 """
 
 
+import os
+import random
+import sys
+import tempfile
+import timeit
 import unittest
+from itertools import combinations_with_replacement
+from math import comb
 
-
-def to_base(s, b):
-    res = ""
-    while s:
-        res += str(s % b)
-        s //= b
-    return res[::-1] or "0"
-
-
-def solution(n, b):
-    # Your code here
-    table = {}
-    # 1) Start with a random minion ID n, which is a nonnegative integer of length k in base b
-    k = len(n)
-    while n not in table:
-        # 2) Define x and y as integers of length k.  x has the digits of n in descending order, and y has the digits of n in ascending order
-        x = int("".join(sorted(n, reverse=True)), base=b)
-        y = int("".join(sorted(n)), base=b)
-        # 3) Define z = x - y.  Add leading zeros to z to maintain length k if necessary
-        z = x - y
-        if z == 0:
-            z = "0" * k
-        else:
-            res = ""
-            while z:
-                res += str(z % b)
-                z //= b
-            z = res[::-1].zfill(k)
-        # 4) Assign n = z to get the next minion ID, and go back to step 2
-        table[n] = z
-        n = z
-    counter = 1
-    back_tracker = table[n]
-    while back_tracker != n:
-        counter += 1
-        back_tracker = table[back_tracker]
-    return counter
+from google_foobar.cycles import *  # noqa: F401,F403
 
 
 class TestCase(unittest.TestCase):
@@ -100,6 +71,180 @@ class TestCase(unittest.TestCase):
     def test_210022_3(self):
         self.assertEqual(solution("210022", 3), 3)
 
+    def test_step_matches_reference(self):
+        random.seed(0)
+        for k in range(2, 10):
+            for b in range(2, 11):
+                for _ in range(20):
+                    n = random_id(k, b)
+                    expected = digit_counts(reference_step(n, b), b)
+                    self.assertEqual(step(digit_counts(n, b), b, k), expected)
+
+    def test_solution_matches_reference(self):
+        random.seed(1)
+        for k in range(2, 10):
+            for b in range(2, 11):
+                n = random_id(k, b)
+                self.assertEqual(solution(n, b), reference_solution(n, b), msg=(n, b))
+
+    def test_rank_is_dense(self):
+        for k, b in ((2, 2), (4, 3), (6, 10)):
+            ranks = set()
+            for digits in combinations_with_replacement(range(b), k):
+                ranks.add(rank(digit_counts("".join(map(str, digits)), b), k))
+            self.assertEqual(ranks, set(range(comb(k + b - 1, k))))
+
+    def test_cycle_index(self):
+        random.seed(2)
+        with tempfile.TemporaryDirectory() as tmp:
+            index = CycleIndex(build_index(os.path.join(tmp, "cycles.idx")))
+            try:
+                self.assertEqual(index.lookup("1211", 10), 1)
+                self.assertEqual(index.lookup("210022", 3), 3)
+                self.assertIsNone(index.lookup("1", 10))
+                for k in K_RANGE:
+                    for b in B_RANGE:
+                        n = random_id(k, b)
+                        self.assertEqual(index.lookup(n, b), reference_solution(n, b), msg=(n, b))
+            finally:
+                index.close()
+
+    def test_cycle_cache(self):
+        cache = CycleCache(max_entries=1000)
+        k, b = 4, 10
+        self.assertEqual(walk(digit_counts("1211", b), b, k, cache), 1)
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 0)
+        self.assertGreater(stats["entries"], 1)
+        # 2111 has the same digits as 1211, so the second query is one cache hit
+        self.assertEqual(walk(digit_counts("2111", b), b, k, cache), 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["entries"], stats["entries"])
+
+    def test_cycle_cache_eviction(self):
+        random.seed(3)
+        cache = CycleCache(max_entries=5)
+        for _ in range(50):
+            n = random_id(6, 7)
+            self.assertEqual(walk(digit_counts(n, 7), 7, 6, cache), reference_solution(n, 7))
+        stats = cache.stats()
+        self.assertLessEqual(stats["entries"], 5)
+        self.assertGreater(stats["evictions"], 0)
+        cache.resize(2)
+        self.assertEqual(len(cache.entries), 2)
+        cache.clear()
+        self.assertEqual(cache.stats()["hits"], 0)
+
+    def test_solve_many(self):
+        random.seed(4)
+        ids = [random_id(random.randint(2, 9), 5) for _ in range(300)] + ["1", "22"]
+        expected = [reference_solution(n, 5) for n in ids]
+        self.assertEqual(solve_many(ids, 5), expected)
+        self.assertEqual(solve_many(ids, 5, workers=2), expected)
+        self.assertEqual(solve_many([], 5), [])
+        self.assertEqual(solve_many((n for n in ids), 5), expected)
+
+    def test_brent_solution(self):
+        random.seed(5)
+        self.assertEqual(brent_solution("210022", 3), 3)
+        for k in K_RANGE:
+            for b in B_RANGE:
+                n = random_id(k, b)
+                self.assertEqual(brent_solution(n, b), reference_solution(n, b), msg=(n, b))
+
+    def test_large_bases(self):
+        random.seed(6)
+        self.assertEqual(brent_solution("3fa07c", 16), solution("3fa07c", 16))
+        for k, b in ((20, 16), (30, 36), (10, 100)):
+            n = [random.randrange(b) for _ in range(k)]
+            self.assertEqual(brent_solution(n, b), walk(digit_counts(n, b), b, k, CycleCache()))
+        with self.assertRaises(ValueError):
+            brent_solution([1, 100], 100)
+
+    def test_kaprekar_graph(self):
+        graph = KaprekarGraph(4, 10)
+        self.assertEqual(len(graph.states), comb(13, 4))
+        self.assertEqual(sum(graph.basin_size), len(graph.states))
+        cycles = {tuple(sorted(graph.states[node] for node in cycle)) for cycle in graph.cycles}
+        self.assertIn((digit_counts("6174", 10),), cycles)
+        self.assertIn((digit_counts("0000", 10),), cycles)
+        for node, counts in enumerate(graph.states):
+            target = graph.successor[node]
+            self.assertEqual(graph.states[target], step(counts, 10, 4))
+            if graph.tail[node]:
+                self.assertEqual(graph.tail[node], graph.tail[target] + 1)
+                self.assertEqual(graph.cycle_id[node], graph.cycle_id[target])
+            else:
+                self.assertIn(node, graph.cycles[graph.cycle_id[node]])
+
+    def test_kaprekar_graph_cycle_lengths(self):
+        random.seed(7)
+        for k, b in ((6, 3), (5, 7), (3, 10)):
+            graph = KaprekarGraph(k, b)
+            lengths = graph.cycle_lengths()
+            for _ in range(30):
+                n = random_id(k, b)
+                self.assertEqual(lengths[rank(digit_counts(n, b), k)], reference_solution(n, b))
+        summary = KaprekarGraph(6, 3).summary()
+        self.assertIn(3, [len(cycle["members"]) for cycle in summary["cycles"]])
+
+    def test_invalid_digit(self):
+        with self.assertRaises(ValueError):
+            solution("1291", 3)
+
+
+def benchmark(samples=200, number=20):
+    random.seed(0)
+    print("  k   b  reference (us/step)  step (us/step)")
+    for k in range(2, 10):
+        for b in range(2, 11):
+            ids = [random_id(k, b) for _ in range(samples)]
+            counts = [digit_counts(n, b) for n in ids]
+            ref = timeit.timeit(lambda: [reference_step(n, b) for n in ids], number=number)
+            fast = timeit.timeit(lambda: [step(c, b, k) for c in counts], number=number)
+            scale = 1e6 / (samples * number)
+            print("{:>3} {:>3} {:>20.2f} {:>15.2f}".format(k, b, ref * scale, fast * scale))
+
+
+def graph_report(k_range=K_RANGE, b_range=B_RANGE):
+    print("  k   b   states  cycles  longest cycle  max tail  largest basin")
+    for k in k_range:
+        for b in b_range:
+            graph = KaprekarGraph(k, b)
+            print(
+                "{:>3} {:>3} {:>8} {:>7} {:>14} {:>9} {:>14}".format(
+                    k,
+                    b,
+                    len(graph.states),
+                    len(graph.cycles),
+                    max(map(len, graph.cycles)),
+                    graph.max_tail(),
+                    max(graph.basin_size),
+                )
+            )
+
+
+def stress_benchmark(cases=((50, 10), (100, 16), (200, 36), (300, 100), (500, 100), (200, 256))):
+    # reference_solution() writes one character per digit, so it cannot run
+    # at all for b > 10; brent_solution() keeps O(b) memory at any k.
+    random.seed(0)
+    print("   k    b  cycle  brent (ms)  reference (ms)")
+    for k, b in cases:
+        n = [random.randrange(b) for _ in range(k)]
+        brent = timeit.timeit(lambda: brent_solution(n, b), number=1)
+        if b <= 10:
+            text = "".join(map(str, n))
+            reference = "{:.2f}".format(1e3 * timeit.timeit(lambda: reference_solution(text, b), number=1))
+        else:
+            reference = "n/a"
+        print("{:>4} {:>4} {:>6} {:>11.2f} {:>15}".format(k, b, brent_solution(n, b), 1e3 * brent, reference))
+
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["build-index"]:
+        print(build_index(*sys.argv[2:3]))
+        sys.exit()
     unittest.main(verbosity=2)
+    # benchmark()
+    # stress_benchmark()
+    # graph_report()
@@ -47,219 +47,18 @@ Output:
 """
 
 from __future__ import print_function, division
+import sys
 import unittest
-from fractions import gcd as get_gcd
+import unittest.mock
 from fractions import Fraction
-from collections import OrderedDict as dict
+from itertools import combinations
+import timeit
 import random
+import os
+import tempfile
 
-thought = """
-Given n pegs := [P1, P2, P3, ... , Pn]
-solve for n gears := [G1, G2, G3, ..., Gn]
-Because we want gear ratio to be 2, so that
-(1.) 2 = (G1 / G2) * (G2 / G3) * (G3 / G4) * ... * (Gn-1 / Gn) = (G1 / Gn)
-
-(2.) Gn = G1 / 2 = |Pn - Pn-1| - Gn-1
-(3.) if i > 1, Gi = |Pi - Pi-1| - Gi-1; if i = 1, Gi = G1
-(4.) G1 = 2 * (|Pn - Pn-1| - Gn-1)
-(5.) x = 2 * [f - e - (e - d - (d - c - (c - b - (b - a - x))))]
-
-
-==== previous ====
-Given n pegs := [p1, p2, p3, ... , pn]
-Calculate n gears (radius) := [G1, G2, G3, ..., Gn]
-and their physical constrains := [G1_min <= G1 <= G1_max, G2_min <= G2 <= G2_max, ..., ]
-where Gi_max denote the maximum radius before Gi collide with adjacent pegs, 
-and Gi_min denote the minimum radius Gi requires to touch adjacent gears if the gears are already on their maximum radius (Gi-1_max and Gi+1_max).
-If the physical constrains conflict or not possible, return impossible early
-
-So that:
-1.) "2 = (G1 / G2) * (G2 / G3) * (G3 / G4) * ... * (Gn-1 / Gn) = (G1 / Gn)"
-2.) "G1 + G2 = |p2 - p1|; G2 + G3 = |p3 - p2|; ..."
-3.) "pn - p1 = G1 + 2 G2 + 2 G3 + 2 G4 + ... + 2 Gn-1 + Gn"
-
-From formula (1), we know that G1 / Gn = 2
-So we can update G1_min, G1_max and Gn_min, Gn_max to 
-4.) G1_min = 2 * Gn_min = max(G1_min, 2 * Gn_min)
-5.) G1_max = 2 * Gn_max = min(G1_max, 2 * Gn_max)
-
-From this point, because G1_max and Gn_max potentially got shorter, domino-ly update all adjacent gears 
-"""
-
-
-def solution(pegs):
-    # Your code here
-    n = len(pegs)
-    impossible = [-1, -1]
-    if n < 2:
-        return impossible
-
-    def gap(_a, _b):
-        return pegs[max(_a, _b)] - pegs[min(_a, _b)]
-
-    # (5.) x = 2 * [f - e - (e - d - (d - c - (c - b - (b - a - x))))]
-    # [f - e - (e - d - (d - c - (c - b - (b - a))))]
-    magic_memo = {1: pegs[1] - pegs[0]}
-
-    def magic(p):
-        if p in magic_memo:
-            return magic_memo[p]
-        magic_memo[p] = pegs[p] - pegs[p - 1] - magic(p - 1)
-        return magic_memo[p]
-
-    magic_number = magic(n - 1)
-    if n % 2 == 0:
-        # x = 2/3 * [f - e - (e - d - (d - c - (c - b - (b - a))))]
-        g1 = Fraction(magic_number * 2, 3).limit_denominator()
-    else:
-        # x / 2 = (50 - 30 - (30 - 4 - x))
-        # x = 2 * (50 - 30 - (30 - 4 - x))
-        # -x = 2 * (50 - 30 - (30 - 4 ))
-        # -x = 2 * (50 - 30 - 26)
-        # -x = 2 * (-6)
-        # x = 12'
-        g1 = Fraction(-(magic_number * 2)).limit_denominator()
-    if g1 < 2 or g1 >= gap(0, 1):
-        return impossible
-    # verify
-    gears = [g1]
-    for i in range(1, n):
-        gear = pegs[i] - pegs[i - 1] - gears[i - 1]
-        if gear < 1:
-            return impossible
-        gears.append(gear)
-
-    counter = pegs[0]
-    prev = gears[0]
-    recon = [pegs[0]]
-    for i, gear in enumerate(gears[1:]):
-        counter += prev + gear
-        prev = gear
-        if not pegs[i + 1] - 0.001 <= counter <= pegs[i + 1] + 0.001:
-            return impossible
-        recon.append(counter)
-
-    # print(pegs, gears, recon)
-
-    return [g1.numerator, g1.denominator]
-
-    # verify
-
-    max_table = []
-    for i in range(n):
-        if i == 0:
-            max_table.append(gap(0, 1))
-        elif i == n - 1:
-            max_table.append(gap(n - 2, n - 1))
-        else:
-            max_table.append(min(gap(i, i + 1), gap(i, i - 1)))
-
-    min_table = []
-    for i in range(n):
-        if i == 0:
-            min_table.append(gap(0, 1) - max_table[1])
-        elif i == n - 1:
-            min_table.append(gap(n - 2, n - 1) - max_table[-2])
-        else:
-            min_table.append(
-                max(gap(i, i + 1) - max_table[i + 1], gap(i, i - 1) - max_table[i - 1])
-            )
-        if min_table[i] > max_table[i]:
-            return impossible  # phy_constrains impossible
-    if max_table[0] * 2 < min_table[-1] or min_table[0] * 2 > max_table[-1]:
-        # from 2.) "2 = a / Gn"
-        # if first gear cannot meet 2x gear ratio for last gear
-        return impossible
-
-    # update first and last gear so that "G1 / Gn = 2"
-    new_max = min(max_table[0], 2 * max_table[-1])
-    new_min = max(min_table[0], 2 * min_table[-1], 1)
-    if new_min == new_max:
-        pass
-        # return simplify(new_min, 1)
-    if new_min > new_max:
-        return impossible
-    min_table[0] = new_min
-    min_table[-1] = new_min // 2
-    max_table[0] = new_max
-    max_table[-1] = new_max // 2
-
-    # loop over and update every gears' constrains until converge
-    modify = True
-    while modify:
-        modify = False
-        for i in range(1, n - 1):
-            print(131, dict(zip(pegs, zip(min_table, max_table))))
-            new_min = max(gap(i, i - 1) - max_table[i - 1], gap(i, i + 1) - max_table[i + 1], 1)
-            new_max = min(gap(i, i - 1) - min_table[i - 1], gap(i, i + 1) - min_table[i + 1])
-            if new_min > new_max:
-                return impossible
-            if new_max != max_table[i] or new_min != min_table[i]:
-                modify = True
-                max_table[i] = new_max
-                min_table[i] = new_min
-        print(140, dict(zip(pegs, zip(min_table, max_table))))
-        continue
-        # update first gear
-        new_min = max(gap(0, 1) - max_table[1], 1)
-        new_max = gap(0, 1) - min_table[1]
-        if new_min > new_max:
-            # return impossible
-            pass
-        if new_max != max_table[0] or new_min != min_table[0]:
-            modify = True
-            min_table[0] = new_min
-            max_table[0] = new_max
-
-        # update last gear
-        new_min = max(gap(n - 2, n - 1) - max_table[-2], 1)
-        new_max = gap(n - 2, n - 1) - min_table[-2]
-        if new_min > new_max:
-            pass
-            # return impossible
-        if new_max != max_table[-1] or new_min != min_table[-1]:
-            modify = True
-            min_table[-1] = new_min
-            max_table[-1] = new_max
-
-        print(160, dict(zip(pegs, zip(min_table, max_table))))
-        # update first and last gear so that "G1 / Gn = 2"
-        new_max = min(max_table[0], 2 * max_table[-1])
-        new_min = max(min_table[0], 2 * min_table[-1], 1)
-        if new_min == new_max:
-            pass
-            # return simplify(new_min, 1)
-        if new_min > new_max:
-            print(168, new_min, new_max)
-            return impossible
-        if new_max != max_table[0] or new_min != min_table[0]:
-            modify = True
-            min_table[0] = new_min
-            max_table[0] = new_max
-
-        if new_max // 2 != max_table[-1] or new_min // 2 != min_table[-1]:
-            modify = True
-            min_table[-1] = new_min // 2
-            max_table[-1] = new_max // 2
-
-    return simplify(g1, 1) if n % 2 else simplify(g1, 3)
-
-
-def random_testcase(n):
-    # p => [1, 10_000]
-    # n => [2, 20]
-    gears = [random.randint(1, 500) for _ in range(n)]
-    if gears[0] % 2 != 0:
-        gears[0] += 1
-    gears.append(gears[0] // 2)
-    p = [gears[0]]
-    counter = gears[0]
-    prev = gears[0]
-    for gear in gears[1:]:
-        counter += prev + gear
-        prev = gear
-        p.append(counter)
-    return p, [gears[0], 1]
+from google_foobar.gears import *  # noqa: F401,F403
+from google_foobar.memo import ResultCache, cached
 
 
 class TestCase(unittest.TestCase):
@@ -288,12 +87,12 @@ class TestCase(unittest.TestCase):
         self.assertEqual(solution([4, 30, 50]), [12, 1])
 
     def test_2_802_1392(self):
-        return
-        self.assertEqual(solution([2, 802, 1392]), [-1, -1])
+        # gears 420 / 380 / 210
+        self.assertEqual(solution([2, 802, 1392]), [420, 1])
 
     def test_2_802_1394(self):
-        return
-        self.assertEqual(solution([2, 802, 1392]), [420, 1])
+        # gears 416 / 384 / 208
+        self.assertEqual(solution([2, 802, 1394]), [416, 1])
 
     def test_4_17_50(self):
         self.assertEqual(solution([4, 17, 50]), [-1, -1])
@@ -307,25 +106,235 @@ class TestCase(unittest.TestCase):
     def test_4_6_50_52_pegs_too_far(self):
         self.assertEqual(solution([4, 6, 50, 52]), [-1, -1])
 
+    def test_matches_reference(self):
+        random.seed(1)
+        for n in range(2, 21):
+            for _ in range(50):
+                inp, outp = random_testcase(n - 1)
+                self.assertEqual(solution(inp), outp)
+                self.assertEqual(solution(inp), reference_solution(inp))
+                inp[random.randint(0, n - 1)] += random.choice((-1, 1))
+                if inp == sorted(set(inp)):
+                    self.assertEqual(solution(inp), reference_solution(inp), msg=inp)
+
+    def test_million_pegs(self):
+        random.seed(2)
+        inp, outp = random_testcase(10 ** 6 - 1)
+        self.assertEqual(len(inp), 10 ** 6)
+        self.assertEqual(solution(inp), outp)
+        inp[-1] += 1
+        self.assertNotEqual(solution(inp), outp)
+
+    def test_solve_batch(self):
+        random.seed(3)
+        layouts = [[4, 30, 50], [4, 17, 50], [10, 17], [30, 60], [5]]
+        for n in range(2, 21):
+            for _ in range(20):
+                inp, _ = random_testcase(n - 1)
+                if random.random() < 0.5:
+                    inp[random.randint(0, n - 1)] += 1
+                layouts.append(inp)
+        width = max(map(len, layouts))
+        padded = [layout + [0] * (width - len(layout)) for layout in layouts]
+        result = solve_batch(padded, [len(layout) for layout in layouts])
+        self.assertEqual(result.shape, (len(layouts), 2))
+        self.assertEqual(result.tolist()[:5], [[12, 1], [-1, -1], [14, 3], [20, 1], [-1, -1]])
+        for layout, row in zip(layouts, result.tolist()):
+            self.assertEqual(row, solution(layout), msg=layout)
+        self.assertEqual(solve_batch(layouts).tolist(), result.tolist())
+        self.assertEqual(solve_batch([]).tolist(), [])
+        # without NumPy every row goes through solution()
+        with unittest.mock.patch.dict(sys.modules, {"numpy": None}):
+            self.assertEqual(solve_batch(padded, [len(layout) for layout in layouts]).tolist(), result.tolist())
+
+    def test_solve_batch_ndarray(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+        padded = numpy.array([[4, 30, 50, 0], [4, 17, 50, 0], [10, 17, 0, 0], [4, 30, 50, 52]])
+        expected = [[12, 1], [-1, -1], [14, 3], [-1, -1]]
+        self.assertEqual(solve_batch(padded, numpy.array([3, 3, 2, 4])).tolist(), expected)
+        self.assertEqual(solve_batch(padded[:3, :3], [3, 3, 2]).tolist(), expected[:3])
+        self.assertEqual(solve_batch(numpy.zeros((0, 3), dtype=numpy.int64)).tolist(), [])
+        with unittest.mock.patch.dict(sys.modules, {"numpy": None}):
+            self.assertEqual(solve_batch(padded, [3, 3, 2, 4]).tolist(), expected)
+
+    def test_solve_batch_large_values(self):
+        big = [2 ** 40, 2 ** 40 + 26, 2 ** 40 + 46]
+        # the first gear of [1, 10 ** 20] does not fit in int64
+        self.assertGreater(solution([1, 10 ** 20])[0], 2 ** 63)
+        for modules in ({}, {"numpy": None}):
+            with unittest.mock.patch.dict(sys.modules, modules):
+                self.assertEqual(solve_batch([[4, 30, 50], big]).tolist(), [[12, 1], [12, 1]])
+                rows = solve_batch([[4, 30, 50], [1, 10 ** 20], [4, 17, 50]]).tolist()
+                self.assertEqual(rows, [[12, 1], list(UNREPRESENTABLE), [-1, -1]])
+
+    def test_first_gear_range_matches_solution(self):
+        random.seed(4)
+        for n in range(2, 21):
+            for _ in range(20):
+                inp, _ = random_testcase(n - 1)
+                if random.random() < 0.5:
+                    inp[random.randint(0, n - 1)] += 1
+                expected = solution(inp)
+                bounds = first_gear_range(inp)
+                if expected == [-1, -1]:
+                    self.assertIsNone(bounds, msg=inp)
+                else:
+                    g1 = Fraction(*expected)
+                    self.assertEqual(bounds, (g1, g1))
+
+    def test_first_gear_range_without_ratio(self):
+        # gears 12 / 14 / 6 work; G2 = 26 - G1 >= 1 and G3 = G1 - 6 >= 1
+        self.assertEqual(first_gear_range([4, 30, 50], ratio=None), (7, 25))
+        self.assertEqual(first_gear_range([4, 30, 50], ratio=None, max_radius=[10, 30, 30]), (7, 10))
+        self.assertIsNone(first_gear_range([4, 30, 50], ratio=None, min_radius=[1, 20, 15]))
+
+    def test_first_gear_range_with_bounds_and_ratio(self):
+        self.assertEqual(first_gear_range([4, 30, 50], ratio=3), (9, 9))
+        self.assertIsNone(first_gear_range([4, 30, 50], max_radius=[11, 30, 30]))
+        self.assertEqual(first_gear_range([10, 17], ratio=Fraction(1, 2)), (Fraction(7, 3), Fraction(7, 3)))
+        self.assertEqual(first_gear_range([0, 10, 20], ratio=1), (1, 9))
+        self.assertIsNone(first_gear_range([0, 10, 21], ratio=1))
+        self.assertIsNone(first_gear_range([5]))
+
+    def test_gear_train(self):
+        train = GearTrain([4, 30, 50])
+        self.assertEqual(train.solution(), [12, 1])
+        self.assertEqual(train.move(30, 17), [-1, -1])
+        self.assertEqual(train.remove(4), solution([17, 50]))
+        self.assertEqual(train.insert(4000), solution([17, 50, 4000]))
+        self.assertEqual(train.pegs(), [17, 50, 4000])
+        self.assertEqual(len(train), 3)
+        with self.assertRaises(ValueError):
+            train.insert(50)
+        with self.assertRaises(ValueError):
+            train.remove(30)
+        self.assertEqual(GearTrain([]).solution(), [-1, -1])
+        with self.assertRaises(ValueError):
+            GearTrain([4, 30, 4])
+        # cost follows the number of pegs, not how far apart they are
+        train = GearTrain([1, 2 * 10 ** 12])
+        self.assertEqual(train.insert(4 * 10 ** 12 + 1), solution([1, 2 * 10 ** 12, 4 * 10 ** 12 + 1]))
+
+    def test_gear_train_failed_move_keeps_peg(self):
+        train = GearTrain([4, 30, 50])
+        for peg, to in ((4, 50), (4, 0), (17, 20)):
+            with self.assertRaises(ValueError):
+                train.move(peg, to)
+            self.assertEqual(train.pegs(), [4, 30, 50])
+            self.assertEqual(train.solution(), [12, 1])
+        self.assertEqual(train.move(30, 30), [12, 1])
+
+    def test_gear_train_random_edits(self):
+        random.seed(5)
+        for n in range(1, 20):
+            layout, expected = random_testcase(n)
+            train = GearTrain()
+            for peg in random.sample(layout, len(layout)):
+                train.insert(peg)
+            self.assertEqual(train.solution(), expected)
+        pegs, _ = random_testcase(6)
+        train = GearTrain(pegs)
+        self.assertEqual(train.solution(), solution(pegs))
+        for _ in range(500):
+            action = random.random()
+            if action < 0.4 or len(pegs) < 3:
+                peg = random.randint(1, 5000)
+                if peg in pegs:
+                    continue
+                result = train.insert(peg)
+                pegs = sorted(pegs + [peg])
+            elif action < 0.7:
+                peg = random.choice(pegs)
+                result = train.remove(peg)
+                pegs.remove(peg)
+            else:
+                peg, to = random.choice(pegs), random.randint(1, 5000)
+                if to in pegs:
+                    continue
+                result = train.move(peg, to)
+                pegs = sorted([p for p in pegs if p != peg] + [to])
+            self.assertEqual(result, solution(pegs), msg=pegs)
+            self.assertEqual(train.pegs(), pegs)
+
+    def test_search_layouts_matches_brute_force(self):
+        forbidden = [(7, 9), (20, 21)]
+        allowed = allowed_positions(30, forbidden)
+        for count in (2, 3, 4, 5):
+            expected = [
+                list(layout)
+                for layout in combinations(allowed, count)
+                if solution(list(layout))[1] == 1
+            ]
+            self.assertEqual(list(search_layouts(30, count, forbidden)), expected)
+            self.assertEqual(list(search_layouts(30, count, forbidden, workers=2)), expected)
+            self.assertEqual(list(search_layouts(30, count, forbidden, workers=2, chunk_size=3)), expected)
+
+    def test_search_layouts_is_lazy(self):
+        layouts = search_layouts(10000, 20, [(1, 5000), (5010, 5020)])
+        for _, layout in zip(range(5), layouts):
+            self.assertEqual(len(layout), 20)
+            self.assertEqual(solution(layout)[1], 1)
+            self.assertFalse(any(peg <= 5000 or 5010 <= peg <= 5020 for peg in layout))
+        layouts.close()
+
+    def test_search_layouts_parallel_streams(self):
+        start = timeit.default_timer()
+        layouts = search_layouts(2000, 8, workers=2)
+        self.assertEqual(next(layouts), next(search_layouts(2000, 8)))
+        layouts.close()
+        self.assertLess(timeit.default_timer() - start, 30)
+        # many chunks per first peg, across all first pegs
+        serial = list(search_layouts(40, 5))
+        self.assertEqual(list(search_layouts(40, 5, workers=2, chunk_size=50)), serial)
+
+    def test_cached_solution_shares_disk_store(self):
+        random.seed(1)
+        layouts = [random_testcase(random.randint(1, 19))[0] for _ in range(50)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "results.db")
+            first = ResultCache(path=path, max_disk_entries=40)
+            solve = cached(solution, first)
+            self.assertEqual([solve(layout) for layout in layouts], [solution(layout) for layout in layouts])
+            first.prune()
+            self.assertEqual(first.stats()["disk_entries"], 40)
+            # a second worker on the same store warms without recomputing
+            second = ResultCache(path=path)
+            self.assertEqual(second.warm(), 40)
+            solve = cached(solution, second)
+            self.assertEqual([solve(layout) for layout in layouts[10:]], [solution(layout) for layout in layouts[10:]])
+            self.assertEqual(second.stats()["hits"], 40)
+            first.close()
+            second.close()
+
     def test_random(self):
         random.seed(0)
-        # for _ in range(100000):
-        while False:
-            for n in range(1, 2):
+        for n in range(1, 20):
+            for _ in range(200):
                 inp, outp = random_testcase(n)
                 self.assertEqual(solution(inp), outp)
-        """
-        for n in range(2, 20):
-            for _ in range(10000):
-                inp, _ = random_testcase(n)
-                old = str(inp)
-                inp[random.randint(0, n - 1)] += 1
-                ans = solution(inp)
-                self.assertEqual(ans, [-1, -1], msg=str(ans) + " " + str(inp) + " " + old)
-        """
+
+
+def benchmark(count=20000, repeat=5):
+    random.seed(0)
+    layouts = [random_testcase(random.randint(1, 19))[0] for _ in range(count)]
+    width = max(map(len, layouts))
+    padded = [layout + [0] * (width - len(layout)) for layout in layouts]
+    lengths = [len(layout) for layout in layouts]
+    candidates = [
+        ("reference loop", lambda: [reference_solution(layout) for layout in layouts]),
+        ("solution loop", lambda: [solution(layout) for layout in layouts]),
+        ("solve_batch", lambda: solve_batch(padded, lengths)),
+    ]
+    for name, func in candidates:
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        print("{:<16} {:>10.0f} layouts/s".format(name, count / best))
 
 
 if __name__ == "__main__":
     unittest.main(verbosity=9)
     # print(solution([4, 30, 50]))
     # print(solution([30, 60]))
+    # benchmark()
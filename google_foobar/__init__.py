@@ -0,0 +1,24 @@
+"""
+Importable solvers for the foobar challenges in this repository.
+
+The numbered scripts at the top of the repository keep each task statement,
+its tests and benchmarks; the solvers themselves live in the submodules
+below, which are only imported on first access so that ``import
+google_foobar`` stays cheap in worker processes.
+"""
+
+import importlib
+
+__all__ = ["braille", "cycles", "gears", "instrument", "memo", "service"]
+
+
+def __getattr__(name):
+    if name in __all__:
+        module = importlib.import_module("." + name, __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
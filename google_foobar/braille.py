@@ -0,0 +1,561 @@
+"""
+Braille encoder and decoder for the "Braille Translation" challenge
+(1-1_Braille_translation.py holds the task statement and the tests).
+"""
+
+import os
+from functools import lru_cache
+from itertools import islice
+
+
+TABLE = {
+    " ": "000000",
+    "a": "100000",
+    "b": "110000",
+    "c": "100100",
+    "d": "100110",
+    "e": "100010",
+    "f": "110100",
+    "g": "110110",
+    "h": "110010",
+    "i": "010100",
+    "j": "010110",
+    "k": "101000",
+    "l": "111000",
+    "m": "101100",
+    "n": "101110",
+    "o": "101010",
+    "p": "111100",
+    "q": "111110",
+    "r": "111010",
+    "s": "011100",
+    "t": "011110",
+    "u": "101001",
+    "v": "111001",
+    "w": "010111",
+    "x": "101101",
+    "y": "101111",
+    "z": "101011",
+    "C": "000001",
+}
+
+# Grade-2 (contracted) signs. A wordsign stands for the whole word only when
+# the word stands alone; a groupsign may be used anywhere inside a word.
+WORDSIGNS = {
+    "but": TABLE["b"],
+    "can": TABLE["c"],
+    "do": TABLE["d"],
+    "every": TABLE["e"],
+    "from": TABLE["f"],
+    "go": TABLE["g"],
+    "have": TABLE["h"],
+    "just": TABLE["j"],
+    "knowledge": TABLE["k"],
+    "like": TABLE["l"],
+    "more": TABLE["m"],
+    "not": TABLE["n"],
+    "people": TABLE["p"],
+    "quite": TABLE["q"],
+    "rather": TABLE["r"],
+    "so": TABLE["s"],
+    "that": TABLE["t"],
+    "us": TABLE["u"],
+    "very": TABLE["v"],
+    "will": TABLE["w"],
+    "it": TABLE["x"],
+    "you": TABLE["y"],
+    "as": TABLE["z"],
+    "and": "111101",
+    "for": "111111",
+    "of": "111011",
+    "the": "011101",
+    "with": "011111",
+}
+GROUPSIGNS = {
+    "and": "111101",
+    "for": "111111",
+    "of": "111011",
+    "the": "011101",
+    "with": "011111",
+    "ch": "100001",
+    "gh": "110001",
+    "sh": "100101",
+    "th": "100111",
+    "wh": "100011",
+    "ed": "110101",
+    "er": "110111",
+    "ou": "110011",
+    "ow": "010101",
+    "st": "001100",
+    "ar": "001110",
+    "ing": "001101",
+}
+
+# A letter standing alone reads as its wordsign ("b" as "but"), so a lone
+# letter that shares its cell with a wordsign is marked as grade 1.
+GRADE1_INDICATOR = "000011"
+WORDSIGN_LETTERS = frozenset(ch for ch in TABLE if ch.islower() and TABLE[ch] in WORDSIGNS.values())
+
+CHUNK_SIZE = 1 << 16
+# Longest word contracted as a whole. A longer run without whitespace is
+# contracted in pieces of this many characters, so a stream never has to hold
+# more than one piece of it.
+MAX_WORD_LENGTH = 1 << 12
+
+
+class _Translation(dict):
+    # str.translate() table: characters outside TABLE are resolved on first
+    # sight with the same rules solution() always used, then cached.
+    def __init__(self, convert):
+        super().__init__()
+        self.convert = convert
+
+    def __missing__(self, key):
+        ch = chr(key)
+        cells = [TABLE["C"]] if ch.isupper() else []
+        if ch.lower() in TABLE:
+            cells.append(TABLE[ch.lower()])
+        self[key] = "".join(self.convert(cell) for cell in cells)
+        return self[key]
+
+
+def _to_text(cell):
+    return cell
+
+
+def _to_packed(cell):
+    # one latin-1 code point per cell, dot 1 in bit 5 down to dot 6 in bit 0
+    return chr(int(cell, 2))
+
+
+TRANSLATION = _Translation(_to_text)
+PACKED_TRANSLATION = _Translation(_to_packed)
+# TRANSLATION with SEPARATOR turned into a newline, which no cell contains,
+# so a batch joined on SEPARATOR translates in one call and splits back apart
+SEPARATOR = "\x00"
+SPLIT_TRANSLATION = _Translation(_to_text)
+SPLIT_TRANSLATION[ord(SEPARATOR)] = "\n"
+for _code in range(128):
+    TRANSLATION[_code]
+    PACKED_TRANSLATION[_code]
+    SPLIT_TRANSLATION[_code]
+
+
+def _build_trie(signs):
+    root = {}
+    for group, cell in signs.items():
+        node = root
+        for ch in group:
+            node = node.setdefault(ch, {})
+        node[None] = cell
+    return root
+
+
+GROUPSIGN_TRIE = _build_trie(GROUPSIGNS)
+
+UNPACK_TRANSLATION = {value: format(value, "06b") for value in range(64)}
+DOTS = bytes.maketrans(b"01", b"\x00\x01")
+
+# A cell is two columns of three dots, dots 1 2 3 down the left and 4 5 6
+# down the right. DOT_ROWS[r] maps a packed cell to its (left, right) dots in
+# row r of the grid, as 0/1 bytes ready to drop into a page bitmap.
+DOT_ROWS = tuple(
+    (bytes((value >> (5 - row)) & 1 for value in range(256)), bytes((value >> (2 - row)) & 1 for value in range(256)))
+    for row in range(3)
+)
+CELLS_PER_LINE = 40
+LINES_PER_PAGE = 25
+
+# 6-bit cell value -> letter byte; the capital mark decodes to CAPITAL and
+# every value outside TABLE (including 64..255) to INVALID.
+CAPITAL = int(TABLE["C"], 2)
+INVALID = 0xFF
+LETTERS = bytearray([INVALID] * 256)
+for _ch, _cell in TABLE.items():
+    LETTERS[int(_cell, 2)] = CAPITAL if _ch == "C" else ord(_ch)
+LETTERS = bytes(LETTERS)
+
+
+def solution(s):
+    # Your code here
+    return s.translate(TRANSLATION)
+
+
+def reference_solution(s):
+    # the original per-character loop, kept for differential tests and benchmarks
+    buffer = ""
+    for ch in s:
+        if ch.isupper():
+            buffer += TABLE["C"]
+        if ch.lower() in TABLE:
+            buffer += TABLE[ch.lower()]
+    return buffer
+
+
+@lru_cache(maxsize=None)
+def _ascii_cells(np):
+    # SPLIT_TRANSLATION of every ASCII code as one NUL-padded 12-byte entry
+    return np.array([SPLIT_TRANSLATION[code].encode("ascii") for code in range(128)], dtype="S12")
+
+
+def _encode_joined(texts):
+    # Every sign in one pass: NumPy gathers the cells of ASCII text from a
+    # lookup table, anything else goes through a single str.translate().
+    # Returns None when a sign contains SEPARATOR itself.
+    joined = SEPARATOR.join(texts)
+    if joined.count(SEPARATOR) != len(texts) - 1:
+        return None
+    if joined.isascii():
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        if numpy is not None:
+            codes = numpy.frombuffer(joined.encode("ascii"), dtype=numpy.uint8)
+            cells = _ascii_cells(numpy).take(codes).tobytes().translate(None, b"\0")
+            return cells.decode("ascii").split("\n")
+    return joined.translate(SPLIT_TRANSLATION).split("\n")
+
+
+def encode_batch(texts, matrix=False):
+    texts = list(texts)
+    encoded = _encode_joined(texts) if texts else []
+    if encoded is None:
+        encoded = [text.translate(TRANSLATION) for text in texts]
+    if not matrix:
+        return encoded
+    # rows are signs, columns are dots (6 per cell), zero padded to the longest sign
+    width = max(map(len, encoded), default=0)
+    dots = "".join(cells.ljust(width, "0") for cells in encoded).encode("ascii").translate(DOTS)
+    if not width:
+        return memoryview(dots)
+    return memoryview(dots).cast("B", [len(encoded), width])
+
+
+def _contractible(span):
+    # contractions are used for lowercase or capitalized spans only
+    return span.islower() or (span[0].isupper() and span[1:].islower())
+
+
+def _contract_word(word):
+    if len(word) > MAX_WORD_LENGTH:
+        return _contract_pieces(word)
+    if not word.isascii():
+        return word.translate(TRANSLATION)
+    lowered = word.lower()
+    if lowered in WORDSIGN_LETTERS:
+        return GRADE1_INDICATOR + word.translate(TRANSLATION)
+    if lowered in WORDSIGNS and _contractible(word):
+        return (TABLE["C"] if word[0].isupper() else "") + WORDSIGNS[lowered]
+    return _contract_groups(word, lowered)
+
+
+def _contract_pieces(word):
+    # groupsigns only, piece by piece, for a word past MAX_WORD_LENGTH
+    cells = []
+    for i in range(0, len(word), MAX_WORD_LENGTH):
+        piece = word[i : i + MAX_WORD_LENGTH]
+        cells.append(_contract_groups(piece, piece.lower()) if piece.isascii() else piece.translate(TRANSLATION))
+    return "".join(cells)
+
+
+def _contract_groups(word, lowered):
+    cells = []
+    i = 0
+    while i < len(word):
+        # longest groupsign starting at i; trie depth bounds the walk
+        node = GROUPSIGN_TRIE
+        end = cell = None
+        j = i
+        while j < len(word) and lowered[j] in node:
+            node = node[lowered[j]]
+            j += 1
+            if None in node:
+                end, cell = j, node[None]
+        if cell is not None and _contractible(word[i:end]):
+            if word[i].isupper():
+                cells.append(TABLE["C"])
+            cells.append(cell)
+            i = end
+        else:
+            cells.append(word[i].translate(TRANSLATION))
+            i += 1
+    return "".join(cells)
+
+
+@lru_cache(maxsize=None)
+def _whitespace():
+    # compiled on first use, so importing the module does not load re
+    import re
+
+    return re.compile(r"(\s+)")
+
+
+def encode_grade2(s):
+    # words end at any whitespace; the whitespace itself encodes as in grade 1
+    parts = _whitespace().split(s)
+    return "".join(part.translate(TRANSLATION) if i % 2 else _contract_word(part) for i, part in enumerate(parts))
+
+
+def _split_tail(text):
+    # (text through its last whitespace, the partial word after it)
+    if not text or text[-1].isspace():
+        return text, ""
+    tail = text.rsplit(None, 1)[-1]
+    return text[: len(text) - len(tail)], tail
+
+
+def _encode_grade2_stream(chunks):
+    # Holds back the trailing partial word until whitespace or the end of
+    # input. A word past MAX_WORD_LENGTH is flushed a piece at a time, as
+    # _contract_word() would contract it, so pending stays bounded.
+    pending = ""
+    spilled = False
+    for chunk in chunks:
+        text = pending + chunk
+        if spilled:
+            match = _whitespace().search(text)
+            end = len(text) - len(text) % MAX_WORD_LENGTH if match is None else match.start()
+            yield _contract_pieces(text[:end])
+            text, pending = text[end:], ""
+            if match is None:
+                pending = text
+                continue
+            spilled = False
+        head, pending = _split_tail(text)
+        if head:
+            yield encode_grade2(head)
+        if len(pending) > MAX_WORD_LENGTH:
+            spilled = True
+            cut = len(pending) - len(pending) % MAX_WORD_LENGTH
+            yield _contract_pieces(pending[:cut])
+            pending = pending[cut:]
+    if pending:
+        yield _contract_pieces(pending) if spilled else encode_grade2(pending)
+
+
+def encode_packed(s):
+    return s.translate(PACKED_TRANSLATION).encode("latin-1")
+
+
+def decode_packed(data):
+    return str(data, "latin-1").translate(UNPACK_TRANSLATION)
+
+
+def pack_bits(cells):
+    # "0"/"1" text -> 6 bits per cell, big-endian, zero padded to a byte
+    padding = -len(cells) % 8
+    return int(cells + "0" * padding or "0", 2).to_bytes((len(cells) + padding) // 8, "big")
+
+
+def unpack_bits(data, count):
+    bits = format(int.from_bytes(data, "big"), "0{}b".format(len(data) * 8))
+    return bits[: 6 * count]
+
+
+def iter_chunks(source, chunk_size=CHUNK_SIZE):
+    if isinstance(source, (str, bytes, bytearray, memoryview)):
+        yield source
+    elif hasattr(source, "read"):
+        chunk = source.read(chunk_size)
+        while chunk:
+            yield chunk
+            chunk = source.read(chunk_size)
+    else:
+        yield from source
+
+
+def cells_to_packed(cells):
+    if len(cells) % 6 or not set(cells) <= {"0", "1"}:
+        raise ValueError("not a sequence of 6-dot cells: {!r}".format(cells[:60]))
+    return bytes(int(cells[i : i + 6], 2) for i in range(0, len(cells), 6))
+
+
+def _decode_letters(data):
+    letters = data.translate(LETTERS)
+    if INVALID in letters:
+        index = letters.index(INVALID)
+        raise ValueError("unknown cell {:06b} at {}".format(data[index], index))
+    head, *capitalized = letters.split(bytes([CAPITAL]))
+    text = [head.decode("ascii")]
+    for part in capitalized:
+        if not part or part[:1] == b" ":
+            raise ValueError("capital mark is not followed by a letter")
+        text.append(part[:1].decode("ascii").upper())
+        text.append(part[1:].decode("ascii"))
+    return "".join(text)
+
+
+def decode_text(data):
+    if isinstance(data, str):
+        data = cells_to_packed(data)
+    return _decode_letters(bytes(data))
+
+
+def decode_text_stream(source, chunk_size=CHUNK_SIZE):
+    # Partial cells and trailing capital marks are carried over to the next
+    # chunk so a cell or a capitalized letter may straddle a chunk boundary.
+    partial = ""
+    marks = b""
+    for chunk in iter_chunks(source, chunk_size):
+        if isinstance(chunk, str):
+            chunk = partial + chunk
+            cut = len(chunk) - len(chunk) % 6
+            chunk, partial = cells_to_packed(chunk[:cut]), chunk[cut:]
+        data = marks + bytes(chunk)
+        cut = len(data.rstrip(bytes([CAPITAL])))
+        data, marks = data[:cut], data[cut:]
+        if data:
+            yield _decode_letters(data)
+    if partial:
+        raise ValueError("truncated cell at end of input: {!r}".format(partial))
+    if marks:
+        raise ValueError("capital mark is not followed by a letter")
+
+
+def encode_stream(source, chunk_size=CHUNK_SIZE, packed=False, grade=1):
+    # Grade-1 characters are encoded independently, so chunk boundaries never
+    # change the output and memory stays bounded by chunk_size. Grade 2 holds
+    # back the trailing partial word, at most MAX_WORD_LENGTH characters.
+    if grade == 2:
+        for cells in _encode_grade2_stream(iter_chunks(source, chunk_size)):
+            yield cells_to_packed(cells) if packed else cells
+        return
+    for chunk in iter_chunks(source, chunk_size):
+        yield encode_packed(chunk) if packed else chunk.translate(TRANSLATION)
+
+
+def encode_to(source, out, chunk_size=CHUNK_SIZE, packed=False, grade=1):
+    written = 0
+    for cells in encode_stream(source, chunk_size, packed, grade):
+        out.write(cells)
+        written += len(cells)
+    return written
+
+
+def _iter_words(source, chunk_size=CHUNK_SIZE):
+    # words of the text, with None for every line break; a word cut by a
+    # chunk boundary is held back until the next whitespace
+    pending = ""
+    for chunk in iter_chunks(source, chunk_size):
+        text, pending = _split_tail(pending + chunk)
+        yield from _split_words(text)
+    yield from _split_words(pending)
+
+
+def _split_words(text):
+    paragraphs = text.split("\n")
+    for i, paragraph in enumerate(paragraphs):
+        if i:
+            yield None
+        yield from paragraph.split()
+
+
+def iter_lines(source, cells_per_line=CELLS_PER_LINE, chunk_size=CHUNK_SIZE, grade=1):
+    # Packed lines (one latin-1 code point per cell) of at most cells_per_line
+    # cells. Words are separated by one blank cell and wrap as a whole; a word
+    # wider than a line is split, but never between a capital mark and its
+    # letter. Newlines in the text end the current line.
+    if cells_per_line < 2:
+        raise ValueError("a line needs room for at least a capital mark and its letter")
+    blank = chr(0)
+    capital = chr(CAPITAL)
+    line = []
+    width = 0
+    for word in _iter_words(source, chunk_size):
+        if word is None:
+            yield "".join(line)
+            line, width = [], 0
+            continue
+        if grade == 2:
+            cells = cells_to_packed(_contract_word(word)).decode("latin-1")
+        else:
+            cells = word.translate(PACKED_TRANSLATION)
+        if not cells:
+            continue
+        if width and width + 1 + len(cells) > cells_per_line:
+            yield "".join(line)
+            line, width = [], 0
+        while len(cells) > cells_per_line:
+            cut = cells_per_line - (cells[cells_per_line - 1] == capital)
+            yield cells[:cut]
+            cells = cells[cut:]
+        if width:
+            line.append(blank)
+            width += 1
+        line.append(cells)
+        width += len(cells)
+    if line:
+        yield "".join(line)
+
+
+def render_page(lines, page, blank=None):
+    # Draws packed lines into page, a 2-D (3 * lines, 2 * cells) memoryview of
+    # 0/1 bytes, one dot per byte; rows past the last line are left blank.
+    # blank is a page-sized zero buffer to clear page from, so callers that
+    # render many pages can allocate it once.
+    height, width = page.shape
+    flat = page.cast("B")
+    flat[:] = bytes(height * width) if blank is None else blank
+    for number, line in enumerate(lines):
+        data = line.encode("latin-1")
+        for row, (left, right) in enumerate(DOT_ROWS):
+            start = (3 * number + row) * width
+            flat[start : start + 2 * len(data) : 2] = data.translate(left)
+            flat[start + 1 : start + 2 * len(data) : 2] = data.translate(right)
+    return page
+
+
+def iter_pages(
+    source, cells_per_line=CELLS_PER_LINE, lines_per_page=LINES_PER_PAGE, chunk_size=CHUNK_SIZE, grade=1
+):
+    # Yields one dot bitmap per page. Every page is drawn into the same
+    # preallocated buffer, so a page is only valid until the next one is
+    # requested; copy it (bytes(page)) to keep it.
+    blank = bytes(6 * lines_per_page * cells_per_line)
+    page = memoryview(bytearray(blank)).cast("B", [3 * lines_per_page, 2 * cells_per_line])
+    lines = []
+    for line in iter_lines(source, cells_per_line, chunk_size, grade):
+        lines.append(line)
+        if len(lines) == lines_per_page:
+            yield render_page(lines, page, blank)
+            lines = []
+    if lines:
+        yield render_page(lines, page, blank)
+
+
+def iter_signs(path):
+    # a directory holds one sign per file, anything else is one sign per line
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            with open(os.path.join(path, name)) as f:
+                yield f.read().rstrip("\n")
+    else:
+        with open(path) as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+
+def encode_job(signs, grade=1):
+    if grade == 2:
+        return [encode_grade2(sign) for sign in signs]
+    return encode_batch(signs)
+
+
+def run_jobs(signs, workers=None, batch_size=1000, grade=1):
+    # Batches are submitted to a bounded window of futures and results are
+    # yielded in input order, so memory stays flat however large the corpus.
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    signs = iter(signs)
+    batches = iter(lambda: list(islice(signs, batch_size)), [])
+    with ProcessPoolExecutor(workers) as executor:
+        window = deque()
+        for batch in batches:
+            window.append(executor.submit(encode_job, batch, grade))
+            if len(window) >= 2 * workers:
+                yield from window.popleft().result()
+        while window:
+            yield from window.popleft().result()
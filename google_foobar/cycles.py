@@ -0,0 +1,393 @@
+"""
+Cycle lengths of the digit-sorting map from the "Hey, I Already Did That!"
+challenge (2-1_Hey_I_Already_Did_That.py holds the task statement and the
+tests).
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import combinations_with_replacement
+from math import comb
+
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kaprekar_cycles.idx")
+INDEX_MAGIC = b"KCYC"
+INDEX_ENTRY = struct.Struct("<BBII")  # k, b, offset, size
+K_RANGE = range(2, 10)
+B_RANGE = range(2, 11)
+CACHE_ENTRIES = 1 << 16
+
+
+@lru_cache(maxsize=None)
+def _place_values(b, k):
+    # powers[i] = b ** i and repunits[i] = (b ** i - 1) // (b - 1), i.e. "11...1"
+    powers = [1]
+    repunits = [0]
+    for _ in range(k):
+        repunits.append(repunits[-1] + powers[-1])
+        powers.append(powers[-1] * b)
+    return powers, repunits
+
+
+def digit_counts(n, b):
+    # n is a string of base-b digits (0-9, then letters up to base 36) or, for
+    # any base, a sequence of ints
+    counts = [0] * b
+    if isinstance(n, str):
+        for ch in n:
+            counts[int(ch, b)] += 1
+    else:
+        for digit in n:
+            if not 0 <= digit < b:
+                raise ValueError("digit {} out of range for base {}".format(digit, b))
+            counts[digit] += 1
+    return tuple(counts)
+
+
+def value_counts(z, b, k):
+    counts = [0] * b
+    for _ in range(k):
+        z, digit = divmod(z, b)
+        counts[digit] += 1
+    return counts
+
+
+def difference(counts, b, k):
+    # x - y, with x and y built run by run from the digit histogram
+    powers, repunits = _place_values(b, k)
+    x = y = 0
+    for digit in range(b):
+        c = counts[digit]
+        if c:
+            y = y * powers[c] + digit * repunits[c]
+    for digit in range(b - 1, -1, -1):
+        c = counts[digit]
+        if c:
+            x = x * powers[c] + digit * repunits[c]
+    return x - y
+
+
+def step(counts, b, k):
+    # The next ID only depends on the multiset of digits, so states are digit
+    # histograms and no sorting or string conversion is needed.
+    return tuple(value_counts(difference(counts, b, k), b, k))
+
+
+def step_value(z, b, k):
+    # the same map on integer-encoded IDs
+    return difference(value_counts(z, b, k), b, k)
+
+
+def brent_solution(n, b):
+    # Brent's cycle detection on integer-encoded IDs: memory is O(b) whatever
+    # the trajectory length, for any base and length of n.
+    k = len(n)
+    power = length = 1
+    tortoise = difference(digit_counts(n, b), b, k)
+    hare = step_value(tortoise, b, k)
+    while tortoise != hare:
+        if power == length:
+            tortoise = hare
+            power *= 2
+            length = 0
+        hare = step_value(hare, b, k)
+        length += 1
+    return length
+
+
+def rank(counts, k):
+    # Colex rank of the ascending digit sequence d_0 <= ... <= d_k-1, seen as
+    # the k-combination {d_i + i} of range(k + b - 1); dense in [0, C(k+b-1, k)).
+    r = i = 0
+    for digit, c in enumerate(counts):
+        for _ in range(c):
+            r += comb(digit + i, i + 1)
+            i += 1
+    return r
+
+
+def all_states(k, b):
+    # every digit multiset of length k, indexed by rank()
+    states = [None] * comb(k + b - 1, k)
+    for digits in combinations_with_replacement(range(b), k):
+        counts = [0] * b
+        for digit in digits:
+            counts[digit] += 1
+        counts = tuple(counts)
+        states[rank(counts, k)] = counts
+    return states
+
+
+class KaprekarGraph:
+    # The functional graph of the map over all digit multisets of one (k, b),
+    # analysed in one linear pass: states that no state maps to are peeled off
+    # in topological order, what remains are the cycles, and tails and basins
+    # are then filled in by walking the peel order backwards.
+    def __init__(self, k, b):
+        self.k = k
+        self.b = b
+        self.states = all_states(k, b)
+        size = len(self.states)
+        self.successor = array("I", (rank(step(counts, b, k), k) for counts in self.states))
+
+        in_degree = array("I", bytes(4 * size))
+        for node in self.successor:
+            in_degree[node] += 1
+        order = [node for node in range(size) if not in_degree[node]]
+        for node in order:
+            target = self.successor[node]
+            in_degree[target] -= 1
+            if not in_degree[target]:
+                order.append(target)
+
+        self.cycle_id = array("I", bytes(4 * size))
+        self.tail = array("I", bytes(4 * size))
+        self.cycles = []
+        for start in range(size):
+            if in_degree[start]:
+                cycle = [start]
+                in_degree[start] = 0
+                node = self.successor[start]
+                while node != start:
+                    cycle.append(node)
+                    in_degree[node] = 0
+                    node = self.successor[node]
+                for node in cycle:
+                    self.cycle_id[node] = len(self.cycles)
+                self.cycles.append(cycle)
+        for node in reversed(order):
+            target = self.successor[node]
+            self.cycle_id[node] = self.cycle_id[target]
+            self.tail[node] = self.tail[target] + 1
+
+        self.basin_size = array("I", bytes(4 * len(self.cycles)))
+        for cycle in self.cycle_id:
+            self.basin_size[cycle] += 1
+
+    def cycle_lengths(self):
+        return bytearray(len(self.cycles[cycle]) for cycle in self.cycle_id)
+
+    def max_tail(self):
+        return max(self.tail)
+
+    def summary(self):
+        return {
+            "k": self.k,
+            "b": self.b,
+            "states": len(self.states),
+            "cycles": [
+                {"members": [self.states[node] for node in cycle], "basin_size": size}
+                for cycle, size in zip(self.cycles, self.basin_size)
+            ],
+            "max_tail": self.max_tail(),
+        }
+
+
+def cycle_lengths(k, b):
+    return KaprekarGraph(k, b).cycle_lengths()
+
+
+def build_index(path=INDEX_PATH):
+    tables = [(k, b, cycle_lengths(k, b)) for k in K_RANGE for b in B_RANGE]
+    offset = len(INDEX_MAGIC) + 2 + INDEX_ENTRY.size * len(tables)
+    with open(path, "wb") as f:
+        f.write(INDEX_MAGIC)
+        f.write(struct.pack("<H", len(tables)))
+        for k, b, lengths in tables:
+            f.write(INDEX_ENTRY.pack(k, b, offset, len(lengths)))
+            offset += len(lengths)
+        for _, _, lengths in tables:
+            f.write(lengths)
+    load_index.cache_clear()
+    return path
+
+
+class CycleIndex:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[: len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError("not a cycle index: {}".format(path))
+        (count,) = struct.unpack_from("<H", self.data, len(INDEX_MAGIC))
+        self.tables = {}
+        for i in range(count):
+            at = len(INDEX_MAGIC) + 2 + i * INDEX_ENTRY.size
+            k, b, offset, size = INDEX_ENTRY.unpack_from(self.data, at)
+            self.tables[k, b] = offset
+
+    def lookup(self, n, b):
+        return self.lookup_counts(digit_counts(n, b), b, len(n))
+
+    def lookup_counts(self, counts, b, k):
+        offset = self.tables.get((k, b))
+        if offset is None:
+            return None
+        return self.data[offset + rank(counts, k)]
+
+    def close(self):
+        self.data.close()
+
+
+@lru_cache(maxsize=None)
+def load_index(path=INDEX_PATH):
+    if not os.path.exists(path):
+        return None
+    return CycleIndex(path)
+
+
+class CycleCache:
+    # LRU of (digit counts, b) -> length of the cycle that state ends in
+    def __init__(self, max_entries=CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        length = self.entries.get(key)
+        if length is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return length
+
+    def put(self, key, length):
+        self.entries[key] = length
+        self.entries.move_to_end(key)
+        self.shrink()
+
+    def resize(self, max_entries):
+        self.max_entries = max_entries
+        self.shrink()
+
+    def shrink(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+        }
+
+
+CACHE = CycleCache()
+
+
+def walk(n, b, k, cache=CACHE):
+    # Iterate from digit counts n until the trajectory closes a cycle or hits a
+    # state whose cycle is already cached, then cache every visited state.
+    table = {}
+    length = None
+    while n not in table:
+        length = cache.get((n, b))
+        if length is not None:
+            break
+        table[n] = step(n, b, k)
+        n = table[n]
+    else:
+        length = 1
+        back_tracker = table[n]
+        while back_tracker != n:
+            length += 1
+            back_tracker = table[back_tracker]
+    for state in table:
+        cache.put((state, b), length)
+    return length
+
+
+def solution(n, b):
+    # Your code here
+    index = load_index()
+    if index is not None:
+        length = index.lookup(n, b)
+        if length is not None:
+            return length
+    return walk(digit_counts(n, b), b, len(n))
+
+
+def resolve_group(k, b, multisets):
+    # All multisets of one (k, b) share a private unbounded cache, so every
+    # state of their combined trajectories is stepped exactly once.
+    index = load_index()
+    if index is not None and (k, b) in index.tables:
+        return [index.lookup_counts(counts, b, k) for counts in multisets]
+    cache = CycleCache(max_entries=sys.maxsize)
+    return [walk(counts, b, k, cache) for counts in multisets]
+
+
+def solve_many(ids, b, workers=1):
+    # workers=1 resolves in-process, anything else fans (k, b) groups out to a
+    # process pool (None uses every CPU); results follow the order of ids.
+    # one pass over ids, so a generator works as well as a list
+    keys = []
+    groups = {}
+    for n in ids:
+        counts = digit_counts(n, b)
+        keys.append(counts)
+        groups.setdefault(len(n), {})[counts] = None
+    groups = [(k, list(multisets)) for k, multisets in groups.items()]
+    if workers == 1 or len(groups) < 2:
+        results = [resolve_group(k, b, multisets) for k, multisets in groups]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(resolve_group, k, b, multisets) for k, multisets in groups]
+            results = [future.result() for future in futures]
+    lengths = {}
+    for (_, multisets), group_lengths in zip(groups, results):
+        lengths.update(zip(multisets, group_lengths))
+    return [lengths[counts] for counts in keys]
+
+
+def reference_step(n, b):
+    k = len(n)
+    # 2) Define x and y as integers of length k.  x has the digits of n in descending order, and y has the digits of n in ascending order
+    x = int("".join(sorted(n, reverse=True)), base=b)
+    y = int("".join(sorted(n)), base=b)
+    # 3) Define z = x - y.  Add leading zeros to z to maintain length k if necessary
+    z = x - y
+    if z == 0:
+        return "0" * k
+    res = ""
+    while z:
+        res += str(z % b)
+        z //= b
+    return res[::-1].zfill(k)
+
+
+def reference_solution(n, b):
+    # the original string-based solver, kept for differential tests and benchmarks
+    table = {}
+    # 1) Start with a random minion ID n, which is a nonnegative integer of length k in base b
+    while n not in table:
+        # 4) Assign n = z to get the next minion ID, and go back to step 2
+        table[n] = reference_step(n, b)
+        n = table[n]
+    counter = 1
+    back_tracker = table[n]
+    while back_tracker != n:
+        counter += 1
+        back_tracker = table[back_tracker]
+    return counter
+
+
+def random_id(k, b, rng=None):
+    if rng is None:
+        import random as rng
+
+    return "".join(str(rng.randrange(b)) for _ in range(k))
@@ -0,0 +1,668 @@
+"""
+First-gear radius for the "Gearing Up for Destruction" challenge
+(2-2_Gear_ratio.py holds the task statement and the tests).
+"""
+
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, cycle, islice
+from math import gcd
+from operator import mul, sub
+
+
+thought = """
+Given n pegs := [P1, P2, P3, ... , Pn]
+solve for n gears := [G1, G2, G3, ..., Gn]
+Because we want gear ratio to be 2, so that
+(1.) 2 = (G1 / G2) * (G2 / G3) * (G3 / G4) * ... * (Gn-1 / Gn) = (G1 / Gn)
+
+(2.) Gn = G1 / 2 = |Pn - Pn-1| - Gn-1
+(3.) if i > 1, Gi = |Pi - Pi-1| - Gi-1; if i = 1, Gi = G1
+(4.) G1 = 2 * (|Pn - Pn-1| - Gn-1)
+(5.) x = 2 * [f - e - (e - d - (d - c - (c - b - (b - a - x))))]
+
+
+==== previous ====
+Given n pegs := [p1, p2, p3, ... , pn]
+Calculate n gears (radius) := [G1, G2, G3, ..., Gn]
+and their physical constrains := [G1_min <= G1 <= G1_max, G2_min <= G2 <= G2_max, ..., ]
+where Gi_max denote the maximum radius before Gi collide with adjacent pegs, 
+and Gi_min denote the minimum radius Gi requires to touch adjacent gears if the gears are already on their maximum radius (Gi-1_max and Gi+1_max).
+If the physical constrains conflict or not possible, return impossible early
+
+So that:
+1.) "2 = (G1 / G2) * (G2 / G3) * (G3 / G4) * ... * (Gn-1 / Gn) = (G1 / Gn)"
+2.) "G1 + G2 = |p2 - p1|; G2 + G3 = |p3 - p2|; ..."
+3.) "pn - p1 = G1 + 2 G2 + 2 G3 + 2 G4 + ... + 2 Gn-1 + Gn"
+
+From formula (1), we know that G1 / Gn = 2
+So we can update G1_min, G1_max and Gn_min, Gn_max to 
+4.) G1_min = 2 * Gn_min = max(G1_min, 2 * Gn_min)
+5.) G1_max = 2 * Gn_max = min(G1_max, 2 * Gn_max)
+
+From this point, because G1_max and Gn_max potentially got shorter, domino-ly update all adjacent gears 
+"""
+
+
+def solution(pegs):
+    # Your code here
+    return _solve(pegs)[0]
+
+
+def _solve(pegs):
+    # Single pass, exact integers: every radius is kept as a numerator over a
+    # fixed denominator (3 for an even number of pegs, 1 for odd), see (5.).
+    # Also returns how many gears it looked at before answering, which the
+    # instrumentation reports.
+    n = len(pegs)
+    impossible = [-1, -1]
+    if n < 2:
+        return impossible, 0
+    magic_number = 0
+    for i in range(1, n):
+        magic_number = pegs[i] - pegs[i - 1] - magic_number
+    if n % 2 == 0:
+        numerator, denominator = 2 * magic_number, 3
+    else:
+        numerator, denominator = -2 * magic_number, 1
+    # the last gear is half the first, so it needs a first gear of at least 2
+    if numerator < 2 * denominator:
+        return impossible, 1
+    gear = numerator
+    for i in range(1, n):
+        gear = (pegs[i] - pegs[i - 1]) * denominator - gear
+        if gear < denominator:
+            return impossible, i + 1
+    divisor = gcd(numerator, denominator)
+    return [numerator // divisor, denominator // divisor], n
+
+
+def solve_layout(pegs):
+    # Prefix-sum form of the same equations: with C_i the alternating sum of
+    # the first i gaps (signs -, +, -, ...), gear i is (-1)^i * (G1 + C_i)
+    # (0-based), so "every gear >= 1" reduces to one bound on G1 from the
+    # even-indexed prefixes and one from the odd-indexed prefixes.
+    n = len(pegs)
+    if n < 2:
+        return -1, -1
+    prefix = list(accumulate(map(mul, map(sub, pegs[1:], pegs), cycle((-1, 1))), initial=0))
+    # G1 = 2 * G_n, with G_n = (-1)^(n-1) * (G1 + C_n-1)
+    numerator = -2 * prefix[-1]
+    denominator = 3 if n % 2 == 0 else 1
+    if min(prefix[0::2]) * denominator < denominator - numerator:
+        return -1, -1
+    if max(prefix[1::2]) * denominator > -denominator - numerator:
+        return -1, -1
+    divisor = gcd(numerator, denominator)
+    return numerator // divisor, denominator // divisor
+
+
+INT64_MAX = (1 << 63) - 1
+# solve_batch() row for a first gear too large for int64; a real answer always
+# has denominator 1 or 3
+UNREPRESENTABLE = (0, 0)
+
+
+def _solve_batch_numpy(np, layouts, lengths, checked=False):
+    # Vectorized solve_layout() over an (N, width) int64 peg matrix; returns
+    # None when the pegs do not fit, or might overflow the int64 arithmetic.
+    # With checked, also counts the gears _solve() would look at per row.
+    count = len(layouts)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    width = int(lengths.max())
+    if width < 2:
+        return None
+    try:
+        try:
+            pegs = np.array(layouts, dtype=np.int64)
+            if pegs.ndim != 2:
+                raise ValueError
+            pegs = pegs[:, :width]
+        except ValueError:
+            # ragged rows
+            pegs = np.zeros((count, width), dtype=np.int64)
+            for i, (row, length) in enumerate(zip(layouts, lengths.tolist())):
+                pegs[i, :length] = row[:length]
+    except OverflowError:
+        return None
+    if pegs.shape[1] < width or 12 * width * int(np.abs(pegs).max()) > INT64_MAX:
+        return None
+    gaps = np.diff(pegs, axis=1)
+    gaps[:, 0::2] *= -1
+    prefix = np.zeros((count, width), dtype=np.int64)
+    np.cumsum(gaps, axis=1, out=prefix[:, 1:])
+    columns = np.arange(width)
+    valid = columns < lengths[:, None]
+    numerator = -2 * prefix[np.arange(count), np.maximum(lengths - 1, 0)]
+    denominator = np.where(lengths % 2 == 0, 3, 1)
+    # C_0 = 0 is always an even prefix, so 0 is a neutral fill for the
+    # minimum; the maximum needs a fill below any real prefix that still
+    # survives the multiplication by the denominator
+    min_even = np.where(valid & (columns % 2 == 0), prefix, 0).min(axis=1)
+    max_odd = np.where(valid & (columns % 2 == 1), prefix, -(INT64_MAX // 4)).max(axis=1)
+    feasible = (
+        (lengths >= 2)
+        & (min_even * denominator >= denominator - numerator)
+        & (max_odd * denominator <= -denominator - numerator)
+    )
+    divisor = np.gcd(numerator, denominator)
+    result = np.full((count, 2), -1, dtype=np.int64)
+    result[feasible, 0] = (numerator // divisor)[feasible]
+    result[feasible, 1] = (denominator // divisor)[feasible]
+    result = memoryview(result).cast("B").cast("q", [count, 2])
+    if not checked:
+        return result, None
+    # gear i times the denominator, as _solve() steps through them, is
+    # (-1)^i * (numerator + denominator * C_i)
+    gear = np.where(columns % 2 == 0, 1, -1) * (numerator[:, None] + denominator[:, None] * prefix)
+    small = valid & (columns >= 1) & (gear < denominator[:, None])
+    first_small = np.where(small.any(axis=1), small.argmax(axis=1) + 1, lengths)
+    rows = np.where(lengths < 2, 0, np.where(numerator < 2 * denominator, 1, first_small))
+    return result, int(rows.sum())
+
+
+def solve_batch(layouts, lengths=None):
+    # layouts is a sequence or 2-D array of (possibly padded) peg rows; returns an (N, 2)
+    # int64 memoryview of [a, b] pairs, one row per layout. Uses NumPy when it
+    # is installed and the pegs fit in int64, otherwise solution() per row; a
+    # first gear beyond int64 comes back as UNREPRESENTABLE.
+    return _solve_batch(layouts, lengths)[0]
+
+
+def _solve_batch(layouts, lengths=None, checked=False):
+    # solve_batch() plus, with checked, the total gears looked at over all rows
+    lengths = [len(row) for row in layouts] if lengths is None else list(lengths)
+    if len(layouts):
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        if numpy is not None:
+            solved = _solve_batch_numpy(numpy, layouts, lengths, checked)
+            if solved is not None:
+                return solved
+    result = array("q")
+    total = 0
+    for row, length in zip(layouts, lengths):
+        row = row[:length]
+        # exact Python ints, not the fixed-width scalars of an ndarray row
+        answer, gears = _solve(row.tolist() if hasattr(row, "tolist") else row)
+        result.extend(answer if -INT64_MAX <= answer[0] <= INT64_MAX else UNREPRESENTABLE)
+        total += gears
+    if result:
+        result = memoryview(result).cast("B").cast("q", [len(result) // 2, 2])
+    else:
+        result = memoryview(result)
+    return result, total if checked else None
+
+
+def first_gear_range(pegs, ratio=2, min_radius=None, max_radius=None):
+    # Feasible first-gear radii when gear i must stay within
+    # [min_radius[i], max_radius[i]] (default [1, unbounded)) and the last gear
+    # turns `ratio` times as fast as the first; ratio=None drops that rule.
+    # Returns (low, high) as Fractions, or None if there is no solution.
+    #
+    # Gear i is (-1)^i * (G1 + C_i), C_i being the alternating prefix sum
+    # used by solve_layout(), so each peg's bounds translate directly into an
+    # interval for G1 and one pass intersects them all.
+    from fractions import Fraction
+
+    n = len(pegs)
+    if n < 2:
+        return None
+    low, high = Fraction(1), None
+    prefix = 0
+    for i in range(n):
+        if i:
+            prefix += (pegs[i] - pegs[i - 1]) * (-1 if i % 2 else 1)
+        lo = 1 if min_radius is None else min_radius[i]
+        hi = None if max_radius is None else max_radius[i]
+        if i % 2 == 0:
+            low = max(low, lo - prefix)
+            if hi is not None:
+                high = hi - prefix if high is None else min(high, hi - prefix)
+        else:
+            high = -lo - prefix if high is None else min(high, -lo - prefix)
+            if hi is not None:
+                low = max(low, -hi - prefix)
+    if ratio is not None:
+        ratio = Fraction(ratio)
+        # G1 = ratio * G_n, with G_n = (-1)^(n-1) * (G1 + C_n-1)
+        sign = 1 if n % 2 else -1
+        if ratio * sign == 1:
+            if prefix:
+                return None
+        else:
+            g1 = Fraction(ratio * sign * prefix) / (1 - ratio * sign)
+            low, high = max(low, g1), min(high, g1)
+    if low > high:
+        return None
+    return Fraction(low), Fraction(high)
+
+
+def _merge(left, right):
+    # Segment summary: (count, first peg, last peg, alternating gap sum C,
+    # min C over even positions, max C over odd positions), positions being
+    # local to the segment. Right-hand positions flip parity, and their C
+    # flips sign, when the left segment holds an odd number of pegs.
+    if left is None:
+        return right
+    if right is None:
+        return left
+    count, first, last, total, min_even, max_odd = left
+    r_count, r_first, r_last, r_total, r_min_even, r_max_odd = right
+    sign = -1 if count % 2 else 1
+    base = total + sign * (r_first - last)
+    if sign == 1:
+        even = base + r_min_even
+        odd = None if r_max_odd is None else base + r_max_odd
+    else:
+        even = None if r_max_odd is None else base - r_max_odd
+        odd = base - r_min_even
+    if even is not None:
+        min_even = min(min_even, even)
+    if odd is not None:
+        max_odd = odd if max_odd is None else max(max_odd, odd)
+    return count + r_count, first, r_last, base + sign * r_total, min_even, max_odd
+
+
+def _priority(peg):
+    # splitmix64 of the position: a fixed pseudo-random heap priority, so the
+    # treap's shape depends only on the set of pegs
+    z = (peg + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return z ^ (z >> 31)
+
+
+class _Node:
+    # treap node: pegs ordered by position, heap-ordered by priority, and the
+    # _merge() summary of the whole subtree
+    __slots__ = ("peg", "priority", "left", "right", "summary")
+
+    def __init__(self, peg):
+        self.peg = peg
+        self.priority = _priority(peg)
+        self.left = self.right = None
+        self.summary = (1, peg, peg, 0, 0, None)
+
+    def update(self):
+        leaf = (1, self.peg, self.peg, 0, 0, None)
+        left = None if self.left is None else self.left.summary
+        right = None if self.right is None else self.right.summary
+        self.summary = _merge(_merge(left, leaf), right)
+        return self
+
+
+def _split(node, peg):
+    # (pegs < peg, pegs >= peg)
+    if node is None:
+        return None, None
+    if node.peg < peg:
+        node.right, right = _split(node.right, peg)
+        return node.update(), right
+    left, node.left = _split(node.left, peg)
+    return left, node.update()
+
+
+def _join(left, right):
+    # every peg of left lies before every peg of right
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _join(left.right, right)
+        return left.update()
+    right.left = _join(left, right.left)
+    return right.update()
+
+
+def _insert(node, new):
+    if node is None:
+        return new
+    if new.priority > node.priority:
+        new.left, new.right = _split(node, new.peg)
+        return new.update()
+    if new.peg < node.peg:
+        node.left = _insert(node.left, new)
+    else:
+        node.right = _insert(node.right, new)
+    return node.update()
+
+
+def _remove(node, peg):
+    if node.peg == peg:
+        return _join(node.left, node.right)
+    if peg < node.peg:
+        node.left = _remove(node.left, peg)
+    else:
+        node.right = _remove(node.right, peg)
+    return node.update()
+
+
+class GearTrain:
+    # Pegs live in a treap ordered by position whose nodes carry the _merge()
+    # summary of their subtree, so inserting, moving or removing a peg
+    # re-derives the first gear and the "every gear >= 1" check (see
+    # solve_layout()) in expected O(log n) for n pegs, whatever their spread.
+    def __init__(self, pegs=()):
+        pegs = sorted(pegs)
+        for left, right in zip(pegs, pegs[1:]):
+            if left == right:
+                raise ValueError("duplicate peg {}".format(left))
+        # Cartesian tree over the sorted pegs in one pass: the right spine
+        # stays on the stack, and a higher priority peg adopts the part of it
+        # that it outranks as its left subtree
+        spine = []
+        for peg in pegs:
+            node = _Node(peg)
+            last = None
+            while spine and spine[-1].priority < node.priority:
+                last = spine.pop()
+            node.left = last
+            if spine:
+                spine[-1].right = node
+            spine.append(node)
+        self.root = spine[0] if spine else None
+        # summaries bottom-up, children before parents
+        order = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(child for child in (node.left, node.right) if child is not None)
+        for node in reversed(order):
+            node.update()
+
+    def __len__(self):
+        return 0 if self.root is None else self.root.summary[0]
+
+    def __contains__(self, peg):
+        node = self.root
+        while node is not None and node.peg != peg:
+            node = node.left if peg < node.peg else node.right
+        return node is not None
+
+    def pegs(self):
+        pegs, stack, node = [], [], self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            pegs.append(node.peg)
+            node = node.right
+        return pegs
+
+    def insert(self, peg):
+        if peg < 1:
+            raise ValueError("pegs are positive integers")
+        if peg in self:
+            raise ValueError("duplicate peg {}".format(peg))
+        self.root = _insert(self.root, _Node(peg))
+        return self.solution()
+
+    def remove(self, peg):
+        if peg not in self:
+            raise ValueError("no peg at {}".format(peg))
+        self.root = _remove(self.root, peg)
+        return self.solution()
+
+    def move(self, peg, to):
+        # check both ends first so a failed move leaves the train unchanged
+        if peg not in self:
+            raise ValueError("no peg at {}".format(peg))
+        if to < 1:
+            raise ValueError("pegs are positive integers")
+        if to != peg and to in self:
+            raise ValueError("duplicate peg {}".format(to))
+        self.remove(peg)
+        return self.insert(to)
+
+    def solution(self):
+        if self.root is None or self.root.summary[0] < 2:
+            return [-1, -1]
+        count, _, _, total, min_even, max_odd = self.root.summary
+        numerator = -2 * total
+        denominator = 3 if count % 2 == 0 else 1
+        if min_even * denominator < denominator - numerator:
+            return [-1, -1]
+        if max_odd * denominator > -denominator - numerator:
+            return [-1, -1]
+        divisor = gcd(numerator, denominator)
+        return [numerator // divisor, denominator // divisor]
+
+
+def allowed_positions(length, forbidden=()):
+    # peg positions 1..length outside the inclusive (start, end) forbidden zones
+    allowed = bytearray([1]) * (length + 1)
+    allowed[0] = 0
+    for start, end in forbidden:
+        allowed[max(start, 0) : end + 1] = bytes(len(allowed[max(start, 0) : end + 1]))
+    return [peg for peg in range(length + 1) if allowed[peg]]
+
+
+def _extend(layout, prefix, low, high, count, allowed, allowed_set, length, after=None):
+    # layout holds the first i pegs, prefix is C_i-1 and [low, high] the first
+    # gear radii that keep gears 0..i-1 at radius >= 1; when given, `after` is
+    # a layout starting with `layout` and only layouts beyond it are produced
+    i = len(layout)
+    prev = layout[-1]
+    if i == count - 1:
+        # Closed form: the last gear is G1 / 2 and touches gear i - 1, so the
+        # last peg is fixed by G1, and G1 has to be even for it to be an
+        # integer position.
+        # With G1 = 2t the last peg is base + 3t after an even gear i - 1 and
+        # base - t after an odd one, so "last <= length" and "last beyond
+        # after" are bounds on t as well; only t inside all of them is tried.
+        t_low, t_high = (max(low, 2) + 1) // 2, high // 2
+        if (i - 1) % 2 == 0:
+            base = prev + prefix
+            t_high = min(t_high, (length - base) // 3)
+            if after is not None:
+                t_low = max(t_low, (after[i] - base) // 3 + 1)
+            candidates = (base + 3 * t for t in range(t_low, t_high + 1))
+        else:
+            base = prev - prefix
+            t_low = max(t_low, base - length)
+            if after is not None:
+                t_high = min(t_high, base - after[i] - 1)
+            # keep pegs ascending: the last peg moves left as t grows
+            candidates = (base - t for t in range(t_high, t_low - 1, -1))
+        for last in candidates:
+            if last in allowed_set:
+                yield layout + [last]
+        return
+    begin = bisect_right(allowed, prev) if after is None else bisect_left(allowed, after[i])
+    for peg in allowed[begin:]:
+        # every later gap is at least 2, so farther pegs cannot fit either
+        if peg + 2 * (count - 1 - i) > length:
+            break
+        if i % 2:
+            new_prefix = prefix - (peg - prev)
+            new_low, new_high = low, min(high, -1 - new_prefix)
+        else:
+            new_prefix = prefix + (peg - prev)
+            new_low, new_high = max(low, 1 - new_prefix), high
+        if new_high < max(new_low, 2):
+            continue
+        yield from _extend(
+            layout + [peg],
+            new_prefix,
+            new_low,
+            new_high,
+            count,
+            allowed,
+            allowed_set,
+            length,
+            after if after is not None and peg == after[i] else None,
+        )
+
+
+def layouts_from(first, length, count, forbidden=(), after=None):
+    allowed = allowed_positions(length, forbidden)
+    return _extend([first], 0, 1, length, count, allowed, set(allowed), length, after)
+
+
+def _layout_slice(first, length, count, forbidden, after, limit):
+    return list(islice(layouts_from(first, length, count, forbidden, after), limit))
+
+
+class _Stream:
+    # the layouts of one first-peg position, fetched chunk by chunk
+    __slots__ = ("first", "chunks", "after", "done", "paused")
+
+    def __init__(self, first):
+        self.first = first
+        self.chunks = []
+        self.after = None
+        self.done = self.paused = False
+
+
+def search_layouts(length, count, forbidden=(), workers=1, chunk_size=256):
+    # Generate every placement of `count` pegs on a beam of `length` that
+    # avoids the forbidden zones and whose first gear has an integer radius,
+    # in lexicographic order. workers != 1 searches up to 2 * workers
+    # first-peg positions at a time in a process pool (None uses every CPU).
+    # Each task returns at most chunk_size layouts and resumes after the last
+    # one, and no position runs more than two chunks ahead of the consumer, so
+    # results stream and closing the generator stops the search.
+    if count < 2:
+        return
+    firsts = allowed_positions(length, forbidden)
+    if workers == 1:
+        for first in firsts:
+            yield from layouts_from(first, length, count, forbidden)
+        return
+    from collections import deque
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    workers = workers or os.cpu_count() or 1
+    firsts = iter(firsts)
+    streams = deque()
+    running = {}
+    executor = ProcessPoolExecutor(workers)
+
+    def resume(stream):
+        stream.paused = False
+        future = executor.submit(_layout_slice, stream.first, length, count, forbidden, stream.after, chunk_size)
+        running[future] = stream
+
+    try:
+        while True:
+            while len(streams) < 2 * workers:
+                first = next(firsts, None)
+                if first is None:
+                    break
+                streams.append(_Stream(first))
+                resume(streams[-1])
+            if not streams:
+                return
+            head = streams[0]
+            if head.chunks:
+                chunk = head.chunks.pop(0)
+                if head.paused:
+                    resume(head)
+                yield from chunk
+                continue
+            if head.done:
+                streams.popleft()
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stream = running.pop(future)
+                chunk = future.result()
+                stream.chunks.append(chunk)
+                if len(chunk) < chunk_size:
+                    stream.done = True
+                else:
+                    stream.after = chunk[-1]
+                    if len(stream.chunks) < 2:
+                        resume(stream)
+                    else:
+                        stream.paused = True
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def reference_solution(pegs):
+    # the original Fraction-based solver, kept for differential tests
+    from fractions import Fraction
+
+    n = len(pegs)
+    impossible = [-1, -1]
+    if n < 2:
+        return impossible
+
+    def gap(_a, _b):
+        return pegs[max(_a, _b)] - pegs[min(_a, _b)]
+
+    # (5.) x = 2 * [f - e - (e - d - (d - c - (c - b - (b - a - x))))]
+    # [f - e - (e - d - (d - c - (c - b - (b - a))))]
+    magic_memo = {1: pegs[1] - pegs[0]}
+
+    def magic(p):
+        if p in magic_memo:
+            return magic_memo[p]
+        magic_memo[p] = pegs[p] - pegs[p - 1] - magic(p - 1)
+        return magic_memo[p]
+
+    magic_number = magic(n - 1)
+    if n % 2 == 0:
+        # x = 2/3 * [f - e - (e - d - (d - c - (c - b - (b - a))))]
+        g1 = Fraction(magic_number * 2, 3).limit_denominator()
+    else:
+        # x / 2 = (50 - 30 - (30 - 4 - x))
+        # x = 2 * (50 - 30 - (30 - 4 - x))
+        # -x = 2 * (50 - 30 - (30 - 4 ))
+        # -x = 2 * (50 - 30 - 26)
+        # -x = 2 * (-6)
+        # x = 12'
+        g1 = Fraction(-(magic_number * 2)).limit_denominator()
+    if g1 < 2 or g1 >= gap(0, 1):
+        return impossible
+    # verify
+    gears = [g1]
+    for i in range(1, n):
+        gear = pegs[i] - pegs[i - 1] - gears[i - 1]
+        if gear < 1:
+            return impossible
+        gears.append(gear)
+
+    counter = pegs[0]
+    prev = gears[0]
+    recon = [pegs[0]]
+    for i, gear in enumerate(gears[1:]):
+        counter += prev + gear
+        prev = gear
+        if not pegs[i + 1] - 0.001 <= counter <= pegs[i + 1] + 0.001:
+            return impossible
+        recon.append(counter)
+
+    # print(pegs, gears, recon)
+
+    return [g1.numerator, g1.denominator]
+
+
+def random_testcase(n, rng=None):
+    # rng is a random.Random for reproducible layouts; the default is the
+    # module-level generator
+    if rng is None:
+        import random as rng
+
+    # p => [1, 10_000]
+    # n => [2, 20]
+    gears = [rng.randint(1, 500) for _ in range(n)]
+    if gears[0] % 2 != 0:
+        gears[0] += 1
+    gears.append(gears[0] // 2)
+    p = [gears[0]]
+    counter = gears[0]
+    prev = gears[0]
+    for gear in gears[1:]:
+        counter += prev + gear
+        prev = gear
+        p.append(counter)
+    return p, [gears[0], 1]
@@ -0,0 +1,256 @@
+"""
+Opt-in instrumentation for the solvers.
+
+enable() swaps the public entry points of the solver modules for wrappers that
+record call latency histograms, input sizes, iteration counts and the cycle
+cache hit rate; disable() puts the original functions back, so nothing is paid
+while instrumentation is off. Callers that should be measured have to look the
+functions up on the module (``google_foobar.braille.solution``) rather than
+keep a reference taken before enable().
+
+The collected metrics export as Prometheus text or as JSON, and profiling()
+captures a cProfile (and optionally tracemalloc) report of a batch run.
+"""
+
+import importlib
+import inspect
+import io
+import json
+import time
+from bisect import bisect_left
+
+# latency histogram upper bounds in seconds: 1, 2.5 and 5 per decade, 1us to 5s
+BUCKETS = tuple(float("{}e{}".format(scale, exponent)) for exponent in range(-6, 1) for scale in (1, 2.5, 5))
+
+
+def _length(value):
+    return len(value)
+
+
+def _total_length(values):
+    return sum(map(len, values))
+
+
+def _counted_solution(pegs):
+    gears = importlib.import_module(".gears", __package__)
+    return gears._solve(pegs)
+
+
+def _counted_solve_batch(layouts, lengths=None):
+    gears = importlib.import_module(".gears", __package__)
+    return gears._solve_batch(layouts, lengths, checked=True)
+
+
+# (module, function) -> (input size, iterations) extractors taking the call's
+# first argument; both are left out when that argument has no length (a
+# generator, say). For iterations, None means "count the module's step calls"
+# and COUNTED means the function of the same name in COUNTED runs in place of
+# the target and returns (result, iterations) in one go.
+COUNTED = {
+    ("gears", "solution"): _counted_solution,
+    ("gears", "solve_batch"): _counted_solve_batch,
+}
+TARGETS = {
+    ("braille", "solution"): (_length, _length),
+    ("braille", "encode_grade2"): (_length, _length),
+    ("braille", "encode_batch"): (_length, _total_length),
+    ("braille", "decode_text"): (_length, _length),
+    ("cycles", "solution"): (_length, None),
+    ("cycles", "brent_solution"): (_length, None),
+    ("cycles", "solve_many"): (_length, None),
+    ("gears", "solution"): (_length, COUNTED),
+    ("gears", "solve_batch"): (_length, COUNTED),
+}
+STEP_FUNCTIONS = ("step", "step_value")
+
+
+class Metrics:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = {}
+
+    def record(self, name, seconds, size, iterations):
+        entry = self.calls.get(name)
+        if entry is None:
+            entry = self.calls[name] = {
+                "buckets": [0] * (len(BUCKETS) + 1),
+                "count": 0,
+                "seconds": 0.0,
+                "size": 0,
+                "iterations": 0,
+            }
+        entry["buckets"][bisect_left(BUCKETS, seconds)] += 1
+        entry["count"] += 1
+        entry["seconds"] += seconds
+        # None when the input had no length to measure
+        if size is not None:
+            entry["size"] += size
+        if iterations is not None:
+            entry["iterations"] += iterations
+
+    def caches(self):
+        cycles = importlib.import_module(".cycles", __package__)
+        return {"cycles": cycles.CACHE.stats()}
+
+    def to_dict(self):
+        return {
+            "buckets": list(BUCKETS),
+            "calls": self.calls,
+            "caches": self.caches(),
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self):
+        lines = [
+            "# HELP google_foobar_call_seconds Solver call latency.",
+            "# TYPE google_foobar_call_seconds histogram",
+        ]
+        for name, entry in sorted(self.calls.items()):
+            label = 'function="{}"'.format(name)
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float("inf"),), entry["buckets"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else "{:g}".format(bound)
+                lines.append('google_foobar_call_seconds_bucket{{{},le="{}"}} {}'.format(label, le, cumulative))
+            lines.append("google_foobar_call_seconds_sum{{{}}} {!r}".format(label, entry["seconds"]))
+            lines.append("google_foobar_call_seconds_count{{{}}} {}".format(label, entry["count"]))
+        for metric, key, help_text in (
+            ("google_foobar_input_size_total", "size", "Total input size (characters, digits, pegs, items)."),
+            ("google_foobar_iterations_total", "iterations", "Characters encoded, map steps or gears checked."),
+        ):
+            lines.append("# HELP {} {}".format(metric, help_text))
+            lines.append("# TYPE {} counter".format(metric))
+            for name, entry in sorted(self.calls.items()):
+                lines.append('{}{{function="{}"}} {}'.format(metric, name, entry[key]))
+        lines.append("# TYPE google_foobar_cache_events_total counter")
+        for cache, stats in sorted(self.caches().items()):
+            for event in ("hits", "misses", "evictions"):
+                lines.append(
+                    'google_foobar_cache_events_total{{cache="{}",event="{}"}} {}'.format(
+                        cache, event, stats[event]
+                    )
+                )
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+_originals = {}
+_steps = [0]
+
+
+def _count_steps(func):
+    def counted(*args, **kwargs):
+        _steps[0] += 1
+        return func(*args, **kwargs)
+
+    return counted
+
+
+def _instrument(name, func, size_of, iterations_of, metrics, counted=None):
+    signature = inspect.signature(func)
+    first = next(iter(signature.parameters))
+
+    def instrumented(*args, **kwargs):
+        value = signature.bind(*args, **kwargs).arguments[first]
+        # measured before the call, and only with a length: a generator
+        # belongs to the function and must not be consumed here
+        sized = hasattr(value, "__len__")
+        size = size_of(value) if sized else None
+        iterations = iterations_of(value) if sized and callable(iterations_of) else None
+        steps = _steps[0]
+        start = time.perf_counter()
+        if counted is None:
+            result = func(*args, **kwargs)
+        else:
+            result, iterations = counted(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        if iterations_of is None:
+            iterations = _steps[0] - steps
+        metrics.record(name, elapsed, size, iterations)
+        return result
+
+    instrumented.__wrapped__ = func
+    instrumented.__name__ = func.__name__
+    instrumented.__doc__ = func.__doc__
+    return instrumented
+
+
+def enabled():
+    return bool(_originals)
+
+
+def enable(metrics=METRICS):
+    if enabled():
+        return metrics
+    for module_name, func_name in TARGETS:
+        module = importlib.import_module("." + module_name, __package__)
+        _originals[module, func_name] = getattr(module, func_name)
+    cycles = importlib.import_module(".cycles", __package__)
+    for func_name in STEP_FUNCTIONS:
+        _originals[cycles, func_name] = getattr(cycles, func_name)
+        setattr(cycles, func_name, _count_steps(getattr(cycles, func_name)))
+    for (module_name, func_name), (size_of, iterations_of) in TARGETS.items():
+        module = importlib.import_module("." + module_name, __package__)
+        func = _originals[module, func_name]
+        name = "{}.{}".format(module_name, func_name)
+        counted = COUNTED[module_name, func_name] if iterations_of is COUNTED else None
+        setattr(module, func_name, _instrument(name, func, size_of, iterations_of, metrics, counted))
+    return metrics
+
+
+def disable():
+    for (module, func_name), func in _originals.items():
+        setattr(module, func_name, func)
+    _originals.clear()
+
+
+class Profile:
+    def __init__(self):
+        self.text = ""
+        self.memory = []
+        self.stats = None
+
+    def dump(self, path):
+        self.stats.dump_stats(path)
+
+
+class profiling:
+    # with profiling(memory=True) as profile: run_batch()
+    # then profile.text holds the cProfile report and profile.memory the
+    # largest allocation sites seen by tracemalloc.
+    def __init__(self, memory=False, sort="cumulative", limit=30):
+        self.memory = memory
+        self.sort = sort
+        self.limit = limit
+        self.profile = Profile()
+
+    def __enter__(self):
+        import cProfile
+
+        if self.memory:
+            import tracemalloc
+
+            tracemalloc.start()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+        return self.profile
+
+    def __exit__(self, *exc):
+        import pstats
+
+        self.profiler.disable()
+        if self.memory:
+            import tracemalloc
+
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            self.profile.memory = snapshot.statistics("lineno")[: self.limit]
+        out = io.StringIO()
+        self.profile.stats = pstats.Stats(self.profiler, stream=out)
+        self.profile.stats.sort_stats(self.sort).print_stats(self.limit)
+        self.profile.text = out.getvalue()
+        return False
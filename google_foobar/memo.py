@@ -0,0 +1,184 @@
+"""
+Memoized solver results.
+
+ResultCache keeps recent results in an in-process LRU and, given a path, in a
+SQLite file that any number of worker processes can share: WAL mode lets them
+read while one writes, and a freshly started worker can warm() its LRU from the
+file instead of recomputing. Both tiers evict by age (ttl seconds) and by size
+(max_entries in memory, max_disk_entries on disk).
+
+    cache = ResultCache(path="results.db", ttl=3600)
+    solution = cached(braille.solution, cache)
+
+Keys are a hash of the function name and the JSON form of the arguments, so one
+store can hold the results of several solvers; values must be JSON too.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+PRUNE_EVERY = 1024
+
+
+def make_key(name, args):
+    data = json.dumps([name, args], separators=(",", ":")).encode()
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class ResultCache:
+    def __init__(self, max_entries=1 << 16, ttl=None, path=None, max_disk_entries=1 << 20, clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.hits = self.disk_hits = self.misses = self.evictions = self.expirations = 0
+        self.writes = 0
+        self._connection = None
+        self._pid = None
+
+    def connection(self):
+        # sqlite connections must not cross a fork, so each process opens its own
+        if self.path is None:
+            return None
+        if self._pid != os.getpid():
+            import sqlite3
+
+            self._connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results"
+                " (key BLOB PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, expires REAL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+            self._pid = os.getpid()
+        return self._connection
+
+    def _expires(self, now):
+        return None if self.ttl is None else now + self.ttl
+
+    def get(self, key):
+        now = self.clock()
+        entry = self.entries.get(key)
+        if entry is not None:
+            value, expires = entry
+            if expires is None or expires > now:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return value
+            del self.entries[key]
+            self.expirations += 1
+        connection = self.connection()
+        if connection is not None:
+            row = connection.execute(
+                "SELECT value, expires FROM results WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (key, now),
+            ).fetchone()
+            if row is not None:
+                self.disk_hits += 1
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        now = self.clock()
+        expires = self._expires(now)
+        self._remember(key, value, expires)
+        connection = self.connection()
+        if connection is not None:
+            connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (key, json.dumps(value), now, expires)
+            )
+            self.writes += 1
+            if self.writes % PRUNE_EVERY == 0:
+                self.prune()
+
+    def _remember(self, key, value, expires):
+        self.entries[key] = value, expires
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def prune(self):
+        # drop expired rows, then the oldest rows beyond max_disk_entries
+        connection = self.connection()
+        if connection is None:
+            return 0
+        removed = connection.execute("DELETE FROM results WHERE expires <= ?", (self.clock(),)).rowcount
+        removed += connection.execute(
+            "DELETE FROM results WHERE key IN"
+            " (SELECT key FROM results ORDER BY created DESC, rowid DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        ).rowcount
+        return removed
+
+    def warm(self, limit=None):
+        # load the newest live rows of the shared store into the LRU
+        connection = self.connection()
+        if connection is None:
+            return 0
+        limit = self.max_entries if limit is None else min(limit, self.max_entries)
+        rows = connection.execute(
+            "SELECT key, value, expires FROM results WHERE expires IS NULL OR expires > ?"
+            " ORDER BY created DESC, rowid DESC LIMIT ?",
+            (self.clock(), limit),
+        ).fetchall()
+        for key, value, expires in reversed(rows):
+            self._remember(key, json.loads(value), expires)
+        return len(rows)
+
+    def clear(self, disk=False):
+        self.entries.clear()
+        self.hits = self.disk_hits = self.misses = self.evictions = self.expirations = 0
+        if disk and self.connection() is not None:
+            self.connection().execute("DELETE FROM results")
+
+    def close(self):
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = self._pid = None
+
+    def stats(self):
+        stats = {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+        }
+        connection = self.connection()
+        if connection is not None:
+            stats["disk_entries"] = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return stats
+
+
+def cached(func, cache=None, name=None):
+    # wraps a solver taking JSON-able positional arguments; the result is
+    # copied through JSON on the way out of the disk store, so callers should
+    # not rely on identity or mutate what they get back
+    cache = ResultCache() if cache is None else cache
+    name = name or "{}.{}".format(func.__module__, func.__name__)
+
+    def memoized(*args):
+        key = make_key(name, args)
+        result = cache.get(key)
+        if result is None:
+            result = func(*args)
+            cache.put(key, result)
+        return result
+
+    memoized.__wrapped__ = func
+    memoized.__name__ = func.__name__
+    memoized.__doc__ = func.__doc__
+    memoized.cache = cache
+    return memoized
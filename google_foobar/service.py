@@ -0,0 +1,254 @@
+"""
+Asyncio front-end for the solvers.
+
+The server speaks newline-delimited JSON over TCP, one request per line:
+
+    {"id": 1, "op": "braille", "text": "Exit"}
+    {"id": 2, "op": "cycles", "n": "210022", "b": 3}
+    {"id": 3, "op": "gears", "pegs": [4, 30, 50]}
+
+and answers each line with {"id": ..., "result": ...} or {"id": ..., "error": ...},
+in completion order. CPU work runs in a process pool so the event loop never
+blocks. Identical in-flight requests share one computation (for cycles,
+"identical" means same digit multiset and base), and requests arriving within
+max_delay of each other are sent to the pool together through the batch APIs;
+an input that fails is retried alone, so it only fails its own request.
+"""
+
+import asyncio
+import json
+import os
+
+from . import braille, cycles, gears
+
+
+def _outcomes(items, solve_all, solve_one):
+    # (True, result) or (False, exception) per item: the whole batch in one
+    # call when it goes through, otherwise item by item so that one bad input
+    # only fails its own request
+    try:
+        return [(True, result) for result in solve_all(items)]
+    except Exception:
+        pass
+    outcomes = []
+    for item in items:
+        try:
+            outcomes.append((True, solve_one(item)))
+        except Exception as error:
+            outcomes.append((False, error))
+    return outcomes
+
+
+def _braille_batch(texts):
+    return _outcomes(texts, braille.encode_batch, braille.solution)
+
+
+def _cycles_batch(items):
+    by_base = {}
+    for position, (n, b) in enumerate(items):
+        by_base.setdefault(b, []).append(position)
+    outcomes = [None] * len(items)
+    for b, positions in by_base.items():
+        ids = [items[i][0] for i in positions]
+        group = _outcomes(ids, lambda ids: cycles.solve_many(ids, b), lambda n: cycles.solution(n, b))
+        for position, outcome in zip(positions, group):
+            outcomes[position] = outcome
+    return outcomes
+
+
+def _gears_batch(layouts):
+    def solve_all(layouts):
+        rows = gears.solve_batch(layouts).tolist()
+        # answers past int64 are exact Python ints in JSON, so re-solve them
+        return [
+            gears.solution(layout) if tuple(row) == gears.UNREPRESENTABLE else row
+            for layout, row in zip(layouts, rows)
+        ]
+
+    return _outcomes(layouts, solve_all, gears.solution)
+
+
+def _braille_key(request):
+    text = request["text"]
+    if not isinstance(text, str):
+        raise ValueError("text must be a string")
+    return text, text
+
+
+def _cycles_key(request):
+    n, b = request["n"], request["b"]
+    # string ids only have digits up to base 36, and digit_counts allocates b
+    # counters on the event loop, so bound b before touching it
+    if not isinstance(n, str) or not isinstance(b, int) or not 2 <= b <= 36:
+        raise ValueError("n must be a string and b an integer from 2 to 36")
+    return (cycles.digit_counts(n, b), b), (n, b)
+
+
+def _gears_key(request):
+    pegs = request["pegs"]
+    if not isinstance(pegs, list) or not all(isinstance(peg, int) for peg in pegs):
+        raise ValueError("pegs must be a list of integers")
+    return tuple(pegs), pegs
+
+
+# op -> (request -> (coalescing key, batch item), batch function)
+OPERATIONS = {
+    "braille": (_braille_key, _braille_batch),
+    "cycles": (_cycles_key, _cycles_batch),
+    "gears": (_gears_key, _gears_batch),
+}
+
+
+class _Batcher:
+    def __init__(self, service, batch_function):
+        self.service = service
+        self.batch_function = batch_function
+        self.pending = []
+        self.flush_handle = None
+
+    def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((item, future))
+        if len(self.pending) >= self.service.max_batch:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.service.max_delay, self.flush)
+        return future
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if batch:
+            asyncio.ensure_future(self.run(batch))
+
+    async def run(self, batch):
+        self.service.stats["batches"] += 1
+        try:
+            results = await self.service.run_in_pool(self.batch_function, [item for item, _ in batch])
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), (ok, result) in zip(batch, results):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(result)
+
+
+class SolverService:
+    def __init__(self, workers=None, max_batch=256, max_delay=0.002, executor=None):
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.executor = executor
+        self.inflight = {}
+        self.batchers = {}
+        self.connections = set()
+        self.stats = {"requests": 0, "coalesced": 0, "batches": 0, "errors": 0}
+
+    def start(self):
+        if self.executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # forked workers would inherit (and keep open) the client sockets
+            # accepted so far, so start them from a clean process instead
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self.executor = ProcessPoolExecutor(
+                self.workers or os.cpu_count() or 1, mp_context=multiprocessing.get_context(method)
+            )
+        return self
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    async def run_in_pool(self, function, items):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, items)
+
+    async def call(self, op, **request):
+        self.stats["requests"] += 1
+        if op not in OPERATIONS:
+            raise ValueError("unknown op {!r}".format(op))
+        make_key, batch_function = OPERATIONS[op]
+        key, item = make_key(request)
+        key = op, key
+        future = self.inflight.get(key)
+        if future is None:
+            batcher = self.batchers.get(op)
+            if batcher is None:
+                batcher = self.batchers[op] = _Batcher(self, batch_function)
+            future = self.inflight[key] = batcher.submit(item)
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(future)
+
+    async def answer(self, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("expected a JSON object, got {}".format(type(request).__name__))
+        except ValueError as error:
+            self.stats["errors"] += 1
+            return {"id": None, "error": "bad request: {}".format(error)}
+        request_id = request.pop("id", None)
+        try:
+            return {"id": request_id, "result": await self.call(request.pop("op", None), **request)}
+        except Exception as error:
+            self.stats["errors"] += 1
+            return {"id": request_id, "error": "{}: {}".format(type(error).__name__, error)}
+
+    async def handle(self, reader, writer):
+        self.connections.add(asyncio.current_task())
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(line):
+            response = json.dumps(await self.answer(line)).encode() + b"\n"
+            async with lock:
+                writer.write(response)
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(respond(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            self.connections.discard(asyncio.current_task())
+
+    async def drain(self):
+        # wait for every client to hang up, e.g. before closing the server
+        while self.connections:
+            await asyncio.wait(list(self.connections))
+
+    async def serve(self, host="127.0.0.1", port=0):
+        self.start()
+        return await asyncio.start_server(self.handle, host, port, limit=1 << 24)
+
+
+async def serve_forever(host="127.0.0.1", port=8765, **kwargs):
+    service = SolverService(**kwargs)
+    server = await service.serve(host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
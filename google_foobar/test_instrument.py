@@ -0,0 +1,101 @@
+"""
+Tests for google_foobar.instrument; run with
+
+    python -m google_foobar.test_instrument
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+import google_foobar
+from google_foobar import instrument
+
+
+class InstrumentTestCase(unittest.TestCase):
+    def setUp(self):
+        self.metrics = instrument.Metrics()
+        self.addCleanup(instrument.disable)
+
+    def test_disabled_is_untouched(self):
+        solution = google_foobar.braille.solution
+        instrument.enable(self.metrics)
+        self.assertIsNot(google_foobar.braille.solution, solution)
+        self.assertIs(google_foobar.braille.solution.__wrapped__, solution)
+        instrument.disable()
+        self.assertIs(google_foobar.braille.solution, solution)
+        self.assertFalse(instrument.enabled())
+
+    def test_records_calls(self):
+        instrument.enable(self.metrics)
+        self.assertEqual(google_foobar.braille.solution("code"), "100100101010100110100010")
+        self.assertEqual(google_foobar.cycles.brent_solution("210022", 3), 3)
+        self.assertEqual(google_foobar.gears.solution(pegs=[4, 30, 50]), [12, 1])
+        calls = self.metrics.calls
+        self.assertEqual(calls["braille.solution"]["count"], 1)
+        self.assertEqual(calls["braille.solution"]["iterations"], 4)
+        self.assertEqual(calls["cycles.brent_solution"]["size"], 6)
+        self.assertGreater(calls["cycles.brent_solution"]["iterations"], 3)
+        self.assertEqual(calls["gears.solution"]["iterations"], 3)
+        self.assertEqual(sum(calls["gears.solution"]["buckets"]), 1)
+
+    def test_counts_gears_checked(self):
+        instrument.enable(self.metrics)
+        gears = google_foobar.gears
+        # [4, 17, 50] fails on the first gear, [4, 48, 50] on the second
+        gears.solution([4, 17, 50])
+        gears.solution([4, 48, 50])
+        self.assertEqual(self.metrics.calls["gears.solution"]["iterations"], 3)
+        self.assertEqual(self.metrics.calls["gears.solution"]["size"], 6)
+        layouts = [[4, 30, 50, 0], [4, 17, 50, 0], [10, 17, 0, 0], [4, 30, 50, -1], [4, 48, 50, 0]]
+        for modules in ({}, {"numpy": None}):
+            with unittest.mock.patch.dict(sys.modules, modules):
+                self.metrics.reset()
+                # lengths, not the padding, say where each row ends
+                result = gears.solve_batch(lengths=[3, 3, 2, 3, 3], layouts=layouts)
+                self.assertEqual(result.tolist(), [[12, 1], [-1, -1], [14, 3], [12, 1], [-1, -1]])
+                self.assertEqual(self.metrics.calls["gears.solve_batch"]["iterations"], 3 + 1 + 2 + 3 + 2)
+                self.assertEqual(self.metrics.calls["gears.solve_batch"]["size"], 5)
+
+    def test_unsized_inputs(self):
+        instrument.enable(self.metrics)
+        texts = (text for text in ("code", "Braille"))
+        self.assertEqual(
+            google_foobar.braille.encode_batch(texts),
+            [google_foobar.braille.solution("code"), google_foobar.braille.solution("Braille")],
+        )
+        self.assertEqual(google_foobar.cycles.solve_many((n for n in ("1211", "2111")), 10), [1, 1])
+        calls = self.metrics.calls
+        self.assertEqual(calls["braille.encode_batch"]["count"], 1)
+        self.assertEqual(calls["braille.encode_batch"]["size"], 0)
+        self.assertEqual(calls["braille.encode_batch"]["iterations"], 0)
+        self.assertEqual(calls["cycles.solve_many"]["size"], 0)
+
+    def test_exports(self):
+        instrument.enable(self.metrics)
+        google_foobar.braille.solution("Braille")
+        google_foobar.cycles.solution("1211", 10)
+        report = json.loads(self.metrics.to_json())
+        self.assertEqual(report["calls"]["braille.solution"]["size"], 7)
+        self.assertIn("hits", report["caches"]["cycles"])
+        text = self.metrics.to_prometheus()
+        self.assertIn('google_foobar_call_seconds_count{function="braille.solution"} 1', text)
+        self.assertIn('google_foobar_call_seconds_bucket{function="braille.solution",le="+Inf"} 1', text)
+        self.assertIn('google_foobar_iterations_total{function="cycles.solution"}', text)
+        self.assertIn('google_foobar_cache_events_total{cache="cycles",event="hits"}', text)
+
+    def test_profiling(self):
+        with instrument.profiling(memory=True, limit=5) as profile:
+            google_foobar.gears.solve_batch([[4, 30, 50]] * 100)
+        self.assertIn("function calls", profile.text)
+        self.assertLessEqual(len(profile.memory), 5)
+        with tempfile.TemporaryDirectory() as tmp:
+            profile.dump(os.path.join(tmp, "batch.prof"))
+            self.assertTrue(os.path.exists(os.path.join(tmp, "batch.prof")))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,291 @@
+"""
+Differential fuzzing and benchmark harness
+==========================================
+
+Feeds random inputs of growing size to the fast paths of the three solvers,
+checks every answer against the brute-force reference implementation kept in
+each google_foobar module (batch, streaming and incremental paths included:
+encode_stream, encode_batch, solve_many, solve_batch, GearTrain and
+first_gear_range), and records per-size timing (p50 / p99 latency and
+ops/sec) in a JSON report. Given a previous report as baseline, any path whose ops/sec drops
+by more than the threshold counts as a regression.
+
+    python harness.py run [-n ITERATIONS] [-s SEED] [-o REPORT] [-b BASELINE] [-t THRESHOLD]
+
+The exit status is 1 on any mismatch or regression. Without the run
+subcommand the harness runs its own unit tests.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import string
+import sys
+import tempfile
+import time
+import unittest
+
+import google_foobar
+
+
+BATCH = 16
+
+
+def braille_cases(rng, size):
+    braille = google_foobar.braille
+    alphabet = string.ascii_letters + " " * 8 + "1!"
+
+    def text(length):
+        return "".join(rng.choice(alphabet) for _ in range(length))
+
+    sign = text(size)
+    letters = "".join(ch for ch in sign if ch.isalpha() or ch == " ")
+    cuts = sorted(rng.randrange(size + 1) for _ in range(rng.randint(0, 8)))
+    chunks = [sign[i:j] for i, j in zip([0] + cuts, cuts + [size])]
+    batch = [text(rng.randint(0, size)) for _ in range(BATCH)]
+    return [
+        ("braille.solution", braille.solution, (sign,), braille.reference_solution(sign)),
+        ("braille.decode_text", braille.decode_text, (braille.solution(letters),), letters),
+        (
+            "braille.encode_stream",
+            lambda parts: "".join(braille.encode_stream(iter(parts))),
+            (chunks,),
+            braille.reference_solution(sign),
+        ),
+        ("braille.encode_batch", braille.encode_batch, (batch,), list(map(braille.reference_solution, batch))),
+    ]
+
+
+def cycles_cases(rng, size):
+    cycles = google_foobar.cycles
+    b = rng.randint(2, 10)
+    n = cycles.random_id(size, b, rng)
+    ids = [cycles.random_id(rng.randint(2, size), b, rng) for _ in range(BATCH)]
+    expected = cycles.reference_solution(n, b)
+    return [
+        ("cycles.solution", cycles.solution, (n, b), expected),
+        ("cycles.brent_solution", cycles.brent_solution, (n, b), expected),
+        (
+            "cycles.solve_many",
+            lambda ids, b: cycles.solve_many(iter(ids), b),
+            (ids, b),
+            [cycles.reference_solution(i, b) for i in ids],
+        ),
+    ]
+
+
+def _layout(rng, size):
+    # a feasible layout of `size` pegs, with one peg nudged half of the time
+    pegs, _ = google_foobar.gears.random_testcase(size - 1, rng)
+    if rng.random() < 0.5:
+        i = rng.randrange(size)
+        low = pegs[i - 1] + 1 if i else 1
+        high = pegs[i + 1] - 1 if i + 1 < size else pegs[i] + 10
+        if low <= high:
+            pegs[i] = rng.randint(low, high)
+    return pegs
+
+
+def _edit_train(pegs, edits):
+    train = google_foobar.gears.GearTrain(pegs)
+    for action, peg, to in edits:
+        if action == "insert":
+            train.insert(peg)
+        elif action == "remove":
+            train.remove(peg)
+        else:
+            train.move(peg, to)
+    return train.solution()
+
+
+def _first_gear(pegs):
+    bounds = google_foobar.gears.first_gear_range(pegs)
+    if bounds is None:
+        return [-1, -1]
+    low, high = bounds
+    return [low.numerator, low.denominator] if low == high else ["range", low, high]
+
+
+def gears_cases(rng, size):
+    gears = google_foobar.gears
+    pegs = _layout(rng, size)
+    expected = gears.reference_solution(pegs)
+    batch = [_layout(rng, rng.randint(2, size)) for _ in range(BATCH)]
+    width = max(map(len, batch))
+    padded = [layout + [0] * (width - len(layout)) for layout in batch]
+    # random inserts, removes and moves, applied to a sorted copy alongside
+    edited = list(pegs)
+    edits = []
+    for _ in range(rng.randint(1, 8)):
+        action = rng.choice(("insert", "remove", "move"))
+        peg = rng.choice(edited)
+        to = rng.randint(1, edited[-1] + 100)
+        if action == "remove" and len(edited) > 1:
+            edited.remove(peg)
+        elif action != "remove" and to not in edited:
+            if action == "move":
+                edited.remove(peg)
+            else:
+                peg = to
+            edited = sorted(edited + [to])
+        else:
+            continue
+        edits.append((action, peg, to))
+    return [
+        ("gears.solution", gears.solution, (pegs,), expected),
+        ("gears.solve_layout", lambda p: list(gears.solve_layout(p)), (pegs,), expected),
+        (
+            "gears.solve_batch",
+            lambda rows, lengths: gears.solve_batch(rows, lengths).tolist(),
+            (padded, list(map(len, batch))),
+            list(map(gears.reference_solution, batch)),
+        ),
+        ("gears.GearTrain", _edit_train, (pegs, edits), gears.reference_solution(edited)),
+        ("gears.first_gear_range", _first_gear, (pegs,), expected),
+    ]
+
+
+SUITES = {
+    "braille": (braille_cases, (10, 100, 1000, 10000)),
+    "cycles": (cycles_cases, (2, 5, 9)),
+    "gears": (gears_cases, (2, 20, 200, 900)),
+}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(iterations=100, seed=0, suites=SUITES):
+    rng = random.Random(seed)
+    timings = {}
+    mismatches = []
+    for cases, sizes in suites.values():
+        for size in sizes:
+            for _ in range(iterations):
+                for name, func, args, expected in cases(rng, size):
+                    start = time.perf_counter()
+                    result = func(*args)
+                    elapsed = time.perf_counter() - start
+                    timings.setdefault(name, {}).setdefault(size, []).append(elapsed)
+                    if result != expected:
+                        mismatches.append(
+                            {
+                                "path": name,
+                                "size": size,
+                                "input": repr(args)[:200],
+                                "result": result,
+                                "expected": expected,
+                            }
+                        )
+    results = {}
+    for name, by_size in timings.items():
+        results[name] = {
+            str(size): {
+                "calls": len(samples),
+                "p50_us": 1e6 * percentile(samples, 0.5),
+                "p99_us": 1e6 * percentile(samples, 0.99),
+                "ops_per_sec": len(samples) / (sum(samples) or 1e-9),
+            }
+            for size, samples in by_size.items()
+        }
+    return {
+        "seed": seed,
+        "iterations": iterations,
+        "python": platform.python_version(),
+        "results": results,
+        "mismatches": mismatches,
+    }
+
+
+def regressions(report, baseline, threshold=0.2):
+    found = []
+    for name, by_size in baseline["results"].items():
+        for size, before in by_size.items():
+            after = report["results"].get(name, {}).get(size)
+            if after and after["ops_per_sec"] < before["ops_per_sec"] * (1 - threshold):
+                found.append(
+                    {
+                        "path": name,
+                        "size": size,
+                        "before": before["ops_per_sec"],
+                        "after": after["ops_per_sec"],
+                    }
+                )
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Differential fuzzing and benchmarks for the solutions.")
+    parser.add_argument("-n", "--iterations", type=int, default=100, help="random inputs per size")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="bench_output.json", help="where to write the JSON report")
+    parser.add_argument("-b", "--baseline", help="previous JSON report to compare ops/sec against")
+    parser.add_argument("-t", "--threshold", type=float, default=0.2, help="allowed ops/sec drop")
+    args = parser.parse_args(argv)
+
+    report = run(args.iterations, args.seed)
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = regressions(report, json.load(f), args.threshold)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, by_size in sorted(report["results"].items()):
+        for size, stats in by_size.items():
+            print(
+                "{:<24} {:>6} {:>10.1f} us p50 {:>10.1f} us p99 {:>12.0f} ops/s".format(
+                    name, size, stats["p50_us"], stats["p99_us"], stats["ops_per_sec"]
+                )
+            )
+    for mismatch in report["mismatches"]:
+        print("MISMATCH", mismatch, file=sys.stderr)
+    for regression in report.get("regressions", ()):
+        print("REGRESSION", regression, file=sys.stderr)
+    return 1 if report["mismatches"] or report.get("regressions") else 0
+
+
+class HarnessTestCase(unittest.TestCase):
+    def test_run_finds_no_mismatch(self):
+        report = run(iterations=3, seed=1)
+        self.assertEqual(report["mismatches"], [])
+        for cases, sizes in SUITES.values():
+            for name, _, _, _ in cases(random.Random(0), sizes[0]):
+                self.assertEqual(set(report["results"][name]), {str(size) for size in sizes})
+
+    def test_run_reports_mismatch(self):
+        def broken_cases(rng, size):
+            return [("broken", len, ("x" * size,), 0)]
+
+        report = run(iterations=2, suites={"broken": (broken_cases, (1, 2))})
+        self.assertEqual(len(report["mismatches"]), 4)
+        self.assertEqual(report["results"]["broken"]["2"]["calls"], 2)
+
+    def test_regressions(self):
+        def stats(ops):
+            return {"results": {"gears.solution": {"20": {"ops_per_sec": ops}}}}
+
+        self.assertEqual(regressions(stats(90), stats(100)), [])
+        self.assertEqual(len(regressions(stats(70), stats(100))), 1)
+        self.assertEqual(regressions(stats(70), stats(100), threshold=0.5), [])
+
+    def test_main_writes_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "report.json")
+            with contextlib.redirect_stdout(io.StringIO()):
+                status = main(["-n", "1", "-o", output])
+                baseline = main(["-n", "1", "-o", output, "-b", output, "-t", "1"])
+            self.assertEqual((status, baseline), (0, 0))
+            with open(output) as f:
+                self.assertEqual(json.load(f)["regressions"], [])
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["run"]:
+        sys.exit(main(sys.argv[2:]))
+    unittest.main(verbosity=2)
@@ -0,0 +1,271 @@
+"""
+Solver service and load test
+============================
+
+Runs the asyncio front-end from google_foobar.service, or drives one with a
+mix of Braille, cycle and gear requests and reports throughput and tail
+latency (p50 / p99 / p99.9 per op).
+
+    python loadtest.py serve [--host HOST] [--port PORT] [-w WORKERS]
+    python loadtest.py run [--host HOST --port PORT] [-n REQUESTS] [-c CONNECTIONS] [-d DEPTH] [-s SEED]
+
+Without --port, run starts a server in-process on a free port. The mix
+repeats a fraction of its inputs on purpose so that request coalescing shows
+up in the numbers. Without a subcommand the script runs its own unit tests.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import string
+import sys
+import time
+import unittest
+
+import google_foobar
+from google_foobar.service import SolverService, serve_forever
+
+
+def make_requests(count, seed=0, repeat=0.3):
+    rng = random.Random(seed)
+    gears = google_foobar.gears
+    requests = []
+    for i in range(count):
+        if requests and rng.random() < repeat:
+            request = dict(rng.choice(requests))
+        else:
+            op = rng.choice(("braille", "cycles", "gears"))
+            if op == "braille":
+                request = {"op": op, "text": "".join(rng.choice(string.ascii_letters + "  ") for _ in range(64))}
+            elif op == "cycles":
+                b = rng.randint(2, 10)
+                request = {"op": op, "n": "".join(str(rng.randrange(b)) for _ in range(rng.randint(2, 9))), "b": b}
+            else:
+                pegs, _ = gears.random_testcase(rng.randint(1, 19), rng)
+                request = {"op": op, "pegs": pegs}
+        request["id"] = i
+        requests.append(request)
+    return requests
+
+
+async def _connection(host, port, requests, depth, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 24)
+    sent = {}
+    window = asyncio.Semaphore(depth)
+
+    async def receive():
+        for _ in requests:
+            response = json.loads(await reader.readline())
+            op, start = sent.pop(response["id"])
+            latencies.setdefault(op, []).append(time.perf_counter() - start)
+            if "error" in response:
+                errors.append(response)
+            window.release()
+
+    receiver = asyncio.ensure_future(receive())
+    for request in requests:
+        await window.acquire()
+        sent[request["id"]] = request["op"], time.perf_counter()
+        writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+    await receiver
+    writer.close()
+    await writer.wait_closed()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def load_test(host, port, requests, connections=8, depth=32):
+    latencies = {}
+    errors = []
+    shares = [requests[i::connections] for i in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(_connection(host, port, share, depth, latencies, errors) for share in shares if share)
+    )
+    elapsed = time.perf_counter() - start
+    report = {
+        "requests": len(requests),
+        "connections": connections,
+        "depth": depth,
+        "seconds": elapsed,
+        "requests_per_sec": len(requests) / (elapsed or 1e-9),
+        "errors": errors,
+        "ops": {},
+    }
+    for op, samples in sorted(latencies.items()):
+        report["ops"][op] = {
+            "requests": len(samples),
+            "p50_ms": 1e3 * percentile(samples, 0.5),
+            "p99_ms": 1e3 * percentile(samples, 0.99),
+            "p999_ms": 1e3 * percentile(samples, 0.999),
+        }
+    return report
+
+
+async def run(requests, host=None, port=None, workers=None, **kwargs):
+    if port is not None:
+        return await load_test(host or "127.0.0.1", port, requests, **kwargs)
+    service = SolverService(workers=workers)
+    server = await service.serve()
+    try:
+        async with server:
+            host, port = server.sockets[0].getsockname()[:2]
+            report = await load_test(host, port, requests, **kwargs)
+            await service.drain()
+    finally:
+        service.close()
+    report["service"] = dict(service.stats)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the solvers or load test the service.")
+    parser.add_argument("command", choices=("serve", "run"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("-w", "--workers", type=int, help="process pool size (default: every CPU)")
+    parser.add_argument("-n", "--requests", type=int, default=10000)
+    parser.add_argument("-c", "--connections", type=int, default=8)
+    parser.add_argument("-d", "--depth", type=int, default=32, help="in-flight requests per connection")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        asyncio.run(serve_forever(args.host, args.port or 8765, workers=args.workers))
+        return 0
+
+    requests = make_requests(args.requests, args.seed)
+    report = asyncio.run(
+        run(requests, args.host, args.port, args.workers, connections=args.connections, depth=args.depth)
+    )
+    print(
+        "{} requests in {:.2f} s: {:.0f} req/s".format(
+            report["requests"], report["seconds"], report["requests_per_sec"]
+        )
+    )
+    for op, stats in report["ops"].items():
+        print(
+            "{:<8} {:>7} {:>9.2f} ms p50 {:>9.2f} ms p99 {:>9.2f} ms p99.9".format(
+                op, stats["requests"], stats["p50_ms"], stats["p99_ms"], stats["p999_ms"]
+            )
+        )
+    if "service" in report:
+        print("service", report["service"])
+    for error in report["errors"]:
+        print("ERROR", error, file=sys.stderr)
+    return 1 if report["errors"] else 0
+
+
+class ServiceTestCase(unittest.TestCase):
+    def call_all(self, requests, **kwargs):
+        async def go():
+            service = SolverService(workers=2, **kwargs).start()
+            try:
+                results = await asyncio.gather(
+                    *(service.call(**request) for request in requests), return_exceptions=True
+                )
+            finally:
+                service.close()
+            return results, service.stats
+
+        return asyncio.run(go())
+
+    def test_answers_match_solutions(self):
+        requests = [
+            {"op": "braille", "text": "code"},
+            {"op": "cycles", "n": "210022", "b": 3},
+            {"op": "cycles", "n": "1211", "b": 10},
+            {"op": "gears", "pegs": [4, 30, 50]},
+            {"op": "gears", "pegs": [4, 17, 50]},
+        ]
+        results, stats = self.call_all(requests)
+        self.assertEqual(results, ["100100101010100110100010", 3, 1, [12, 1], [-1, -1]])
+        self.assertEqual(stats["coalesced"], 0)
+
+    def test_coalesces_in_flight_requests(self):
+        # 2111 and 1112 have the digits of 1211, so all three share one walk
+        requests = [{"op": "cycles", "n": n, "b": 10} for n in ("1211", "2111", "1112")]
+        requests += [{"op": "braille", "text": "Braille"}] * 3
+        results, stats = self.call_all(requests)
+        self.assertEqual(results[:3], [1, 1, 1])
+        self.assertEqual(len(set(results[3:])), 1)
+        self.assertEqual(stats["coalesced"], 4)
+
+    def test_micro_batches(self):
+        requests = [{"op": "gears", "pegs": [4, 30 + i, 50 + 2 * i]} for i in range(10)]
+        results, stats = self.call_all(requests, max_batch=4)
+        self.assertEqual(results, [google_foobar.gears.solution(r["pegs"]) for r in requests])
+        self.assertEqual(stats["batches"], 3)
+
+    def test_bad_input_fails_only_its_request(self):
+        requests = [
+            {"op": "gears", "pegs": [4, 30, 50]},
+            {"op": "gears", "pegs": [1, 10 ** 20]},
+            {"op": "gears", "pegs": [1, 2 ** 70]},
+            {"op": "cycles", "n": "1211", "b": 10},
+        ]
+        results, stats = self.call_all(requests)
+        self.assertEqual(results[0], [12, 1])
+        # past int64, answered exactly from solution()
+        self.assertEqual(results[1], google_foobar.gears.solution([1, 10 ** 20]))
+        self.assertEqual(results[2], google_foobar.gears.solution([1, 2 ** 70]))
+        self.assertEqual(results[3], 1)
+        self.assertEqual(stats["batches"], 2)
+        # a batch that raises is retried item by item
+        outcomes = google_foobar.service._outcomes([1, 0, 2], lambda xs: [1 / x for x in xs], lambda x: 1 / x)
+        self.assertEqual([ok for ok, _ in outcomes], [True, False, True])
+        self.assertIsInstance(outcomes[1][1], ZeroDivisionError)
+
+    def test_bad_requests(self):
+        results, stats = self.call_all(
+            [
+                {"op": "nope"},
+                {"op": "cycles", "n": 1211, "b": 10},
+                {"op": "cycles", "n": "1", "b": 10 ** 9},
+                {"op": "cycles", "n": "1", "b": 37},
+            ]
+        )
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(stats["batches"], 0)
+
+    def test_load_test_over_tcp(self):
+        requests = make_requests(300, seed=1)
+        requests.append({"id": "bad", "op": "gears", "pegs": "4,30,50"})
+        report = asyncio.run(run(requests, workers=2, connections=3, depth=8))
+        self.assertEqual(report["requests"], 301)
+        self.assertEqual([error["id"] for error in report["errors"]], ["bad"])
+        self.assertEqual(sum(stats["requests"] for stats in report["ops"].values()), 301)
+        self.assertGreater(report["service"]["coalesced"], 0)
+        self.assertLess(report["service"]["batches"], 300)
+
+        async def raw(lines):
+            service = SolverService(workers=1)
+            server = await service.serve()
+            try:
+                async with server:
+                    host, port = server.sockets[0].getsockname()[:2]
+                    reader, writer = await asyncio.open_connection(host, port)
+                    writer.write(b"".join(line + b"\n" for line in lines))
+                    responses = [json.loads(await asyncio.wait_for(reader.readline(), 10)) for _ in lines]
+                    writer.close()
+                    await writer.wait_closed()
+                    await service.drain()
+            finally:
+                service.close()
+            return responses
+
+        # valid JSON that is not an object still gets a reply
+        responses = asyncio.run(raw([b"[1,2]", b'"gears"', b"not json"]))
+        self.assertEqual([response["id"] for response in responses], [None, None, None])
+        self.assertTrue(all("bad request" in response["error"] for response in responses))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] in (["serve"], ["run"]):
+        sys.exit(main(sys.argv[1:]))
+    unittest.main(verbosity=2)